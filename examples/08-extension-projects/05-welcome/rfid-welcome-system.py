@@ -11,12 +11,36 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '../../_shared'))
 from lcd1602 import LCD1602
 import time
 import signal
+import sched
+import selectors
 import threading
+import queue
+import ctypes
+import fcntl
+import struct
+import io
+import re
+import wave
 import json
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 import spidev
 import subprocess
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import numpy as np
+    import sounddevice as sd
+    SOUNDDEVICE_AVAILABLE = True
+except ImportError:
+    SOUNDDEVICE_AVAILABLE = False
+
 from gpiozero import LED, PWMLED, Buzzer, Button
 
 # MFRC522 RFID Reader Configuration
@@ -28,6 +52,7 @@ MISO_PIN = 9         # SPI MISO
 
 # LCD Display (I2C)
 LCD_I2C_ADDRESS = 0x27
+LCD_WIDTH = 16
 
 # Status indicators
 SCAN_LED_PIN = 17        # Scanning indicator
@@ -92,6 +117,103 @@ MIFARE_RESTORE = 0xC2
 MIFARE_TRANSFER = 0xB0
 MIFARE_HALT = 0x50
 
+# Linux spidev ioctl: struct spi_ioc_transfer (tx_buf, rx_buf, len, speed_hz,
+# delay_usecs, bits_per_word, cs_change, tx_nbits, rx_nbits, word_delay, pad)
+SPI_IOC_TRANSFER_FMT = '=QQIIHBBBBBB'
+SPI_IOC_TRANSFER_SIZE = struct.calcsize(SPI_IOC_TRANSFER_FMT)  # 32 bytes
+SPI_IOC_MAGIC = ord('k')
+
+# Greeting audio output
+TTS_SAMPLE_RATE = 22050     # espeak's native WAV sample rate
+AUDIO_WRITE_BLOCK = 4096    # samples per OutputStream.write()
+AUDIO_FADE_SAMPLES = 48     # linear fade at clip edges to avoid clicks
+GREETING_AUDIO_DIR = 'greetings'  # Pre-synthesized greetings, one WAV per card
+
+# IRQ polling: ComIrqReg samples fetched per SPI transaction
+IRQ_POLL_LIMIT = 2000
+IRQ_POLL_BURST = 64
+
+# User database
+USERS_FILE = 'rfid_users.json'
+USERS_SAVE_INTERVAL = 30.0  # seconds between batched user database writes
+
+# Scan history (in memory: oldest entries dropped beyond this;
+# on disk: append-only JSON lines log)
+SCAN_HISTORY_SIZE = 10000
+SCAN_LOG_FILE = 'scan_history.jsonl'
+
+# Time-based greeting bands: (start hour, end hour, salutation)
+_HOUR_BANDS = (
+    (5, 12, "Good morning"),
+    (12, 17, "Good afternoon"),
+    (17, 21, "Good evening"),
+)
+
+# Fallback template for users without a custom greeting
+DEFAULT_GREETING = "Hello, {name}!"
+
+# Buzzer greeting patterns: (beep duration, pause) pairs
+SOUND_PATTERNS = {
+    'default': ((0.1, 0.1), (0.1, 0.1), (0.2, 0.0)),
+    'vip': ((0.1, 0.05),) * 5 + ((0.3, 0.0),),
+    'simple': ((0.2, 0.0),),
+    'melody': ((0.1, 0.1), (0.15, 0.1), (0.1, 0.1), (0.2, 0.0))
+}
+
+# Greeting mode indicators (LCD character / console icon)
+_MODE_CHAR = {"standard": "S", "time_based": "T",
+              "custom": "C", "silent": "Q"}
+_MODE_ICON = {"standard": "📢", "time_based": "🕐",
+              "custom": "✨", "silent": "🔇"}
+
+def _json_dumps(obj, indent=False):
+    """Serialize to JSON bytes, using orjson when it is installed"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    return json.dumps(obj, indent=2 if indent else None).encode('utf-8')
+
+def _json_loads(data):
+    """Parse JSON bytes, using orjson when it is installed"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def _spi_ioc_message(n):
+    """SPI_IOC_MESSAGE(n) request number, i.e. _IOW('k', 0, char[n * 32])"""
+    return (1 << 30) | ((n * SPI_IOC_TRANSFER_SIZE) << 16) | (SPI_IOC_MAGIC << 8)
+
+def _render_greeting(name, template):
+    """Substitute a user's name into their greeting template"""
+    return (template or DEFAULT_GREETING).replace("{name}", name)
+
+def _split_text(text):
+    """Split text at sentence boundaries for incremental synthesis"""
+    return [segment for segment in re.split(r'(?<=[.!?])\s+', text) if segment]
+
+# Main menu text, pre-encoded once and written in one call each
+BANNER = (
+    "RFID Welcome System\n"
+    "==================\n"
+    "🎉 Personalized Greeting System\n"
+    "👤 User Recognition & Tracking\n"
+    "🔊 Multi-Mode Greetings\n"
+    "📊 Visit Statistics\n"
+).encode('utf-8')
+MENU = (
+    "\n\nSelect Demo Mode:\n"
+    "1. Interactive welcome system\n"
+    "2. User registration demo\n"
+    "3. Exit\n"
+).encode('utf-8')
+
+STDIN_FD = 0  # Menu input is read straight from the fd the selector watches
+
+def _write_raw(data):
+    """Write pre-encoded bytes straight to the stdout buffer"""
+    sys.stdout.flush()  # Keep ordering with earlier print() output
+    sys.stdout.buffer.write(data)
+    sys.stdout.buffer.flush()
+
 def signal_handler(sig, frame):
     """Handle Ctrl+C gracefully"""
     print("\nExiting...")
@@ -105,6 +227,8 @@ class MFRC522:
         self.spi = spidev.SpiDev()
         self.spi.open(spi_bus, spi_device)
         self.spi.max_speed_hz = 1000000
+        # Raw handle for batching several transfers into one ioctl
+        self._spi_fd = os.open(f'/dev/spidev{spi_bus}.{spi_device}', os.O_RDWR)
         self._init_device()
     
     def _init_device(self):
@@ -131,6 +255,39 @@ class MFRC522:
         val = self.spi.xfer2([((addr << 1) & 0x7E) | 0x80, 0])
         return val[1]
     
+    def _read_register_burst(self, addr, count):
+        """Read the same register `count` times in one held-CS transfer"""
+        # MFRC522 answers each address byte with the value of the previous
+        # one, so repeating the read address streams samples back
+        read_addr = ((addr << 1) & 0x7E) | 0x80
+        val = self.spi.xfer2([read_addr] * count + [0])
+        return val[1:]
+    
+    def _xfer_batch(self, transfers):
+        """Run several transfers, each in its own CS frame, in one ioctl"""
+        buffers = []
+        msg = bytearray()
+        last = len(transfers) - 1
+        
+        for idx, tx in enumerate(transfers):
+            tx_buf = ctypes.create_string_buffer(bytes(tx), len(tx))
+            rx_buf = ctypes.create_string_buffer(len(tx))
+            buffers.append((tx_buf, rx_buf))
+            
+            # cs_change deselects the chip between transfers (not after the last)
+            msg += struct.pack(SPI_IOC_TRANSFER_FMT,
+                               ctypes.addressof(tx_buf), ctypes.addressof(rx_buf),
+                               len(tx), self.spi.max_speed_hz, 0, 8,
+                               1 if idx != last else 0, 0, 0, 0, 0)
+        
+        fcntl.ioctl(self._spi_fd, _spi_ioc_message(len(transfers)), msg)
+        return [rx_buf.raw for _, rx_buf in buffers]
+    
+    def _read_many_regs(self, addrs):
+        """Read a list of registers in a single ioctl"""
+        rx = self._xfer_batch([(((addr << 1) & 0x7E) | 0x80, 0) for addr in addrs])
+        return [val[1] for val in rx]
+    
     def _set_bit_mask(self, reg, mask):
         """Set bits in register"""
         tmp = self._read_register(reg)
@@ -169,35 +326,44 @@ class MFRC522:
         self._write_register(ComIEnReg, irq_en | 0x80)
         self._clear_bit_mask(ComIrqReg, 0x80)
         self._set_bit_mask(FIFOLevelReg, 0x80)
-        self._write_register(CommandReg, MFRC522_IDLE)
-        
-        for data in send_data:
-            self._write_register(FIFODataReg, data)
         
-        self._write_register(CommandReg, command)
+        # Idle, fill FIFO and start the command in one ioctl
+        self._xfer_batch([
+            ((CommandReg << 1) & 0x7E, MFRC522_IDLE),
+            bytes([(FIFODataReg << 1) & 0x7E]) + bytes(send_data),
+            ((CommandReg << 1) & 0x7E, command),
+        ])
         
         if command == MFRC522_TRANSCEIVE:
             self._set_bit_mask(BitFramingReg, 0x80)
         
-        i = 2000
-        while True:
-            n = self._read_register(ComIrqReg)
-            i -= 1
-            if ~((i != 0) and ~(n & 0x01) and ~(n & wait_irq)):
-                break
+        # Poll ComIrqReg in bursts instead of one transfer per sample
+        i = IRQ_POLL_LIMIT
+        n = 0
+        while i > 0:
+            for n in self._read_register_burst(ComIrqReg, min(IRQ_POLL_BURST, i)):
+                i -= 1
+                if (n & 0x01) or (n & wait_irq):
+                    break
+            else:
+                continue
+            break
         
         self._clear_bit_mask(BitFramingReg, 0x80)
         
         if i != 0:
-            if (self._read_register(ErrorReg) & 0x1B) == 0x00:
+            error, fifo_level, control = self._read_many_regs(
+                [ErrorReg, FIFOLevelReg, ControlReg])
+            
+            if (error & 0x1B) == 0x00:
                 status = 0  # OK
                 
                 if n & irq_en & 0x01:
                     status = 1  # No card
                 
                 if command == MFRC522_TRANSCEIVE:
-                    n = self._read_register(FIFOLevelReg)
-                    last_bits = self._read_register(ControlReg) & 0x07
+                    n = fifo_level
+                    last_bits = control & 0x07
                     if last_bits != 0:
                         back_len = (n - 1) * 8 + last_bits
                     else:
@@ -208,8 +374,7 @@ class MFRC522:
                     if n > 16:
                         n = 16
                     
-                    for i in range(n):
-                        back_data.append(self._read_register(FIFODataReg))
+                    back_data = self._read_many_regs([FIFODataReg] * n)
             else:
                 status = 2  # Error
         
@@ -247,24 +412,20 @@ class MFRC522:
                 if ser_num_check != back_data[4]:
                     status = 2
                 else:
-                    ser_num = back_data[:4]
+                    ser_num = bytearray(back_data[:4])
             else:
                 status = 2
         
         return (status, ser_num)
     
     def select_tag(self, ser_num):
-        """Select tag"""
-        buf = []
-        buf.append(MIFARE_SELECTTAG)
-        buf.append(0x70)
-        
-        for i in range(5):
-            buf.append(ser_num[i])
+        """Select tag (ser_num is the 4-byte UID plus its BCC byte)"""
+        if len(ser_num) < 5:
+            raise ValueError(f"select_tag needs UID + BCC (5 bytes), got {len(ser_num)}")
         
-        pOut = self._calc_crc(buf)
-        buf.append(pOut[0])
-        buf.append(pOut[1])
+        buf = bytearray([MIFARE_SELECTTAG, 0x70])
+        buf += bytes(ser_num[:5])
+        buf += bytes(self._calc_crc(buf))
         
         (status, back_data, back_len) = self._to_card(MFRC522_TRANSCEIVE, buf)
         
@@ -278,8 +439,9 @@ class MFRC522:
         self._clear_bit_mask(DivIrqReg, 0x04)
         self._set_bit_mask(FIFOLevelReg, 0x80)
         
-        for data in p_in_data:
-            self._write_register(FIFODataReg, data)
+        # Data bytes following a write address all land in that register,
+        # so the FIFO is filled in a single transfer
+        self.spi.xfer2([(FIFODataReg << 1) & 0x7E] + list(p_in_data))
         
         self._write_register(CommandReg, MFRC522_CALCCRC)
         
@@ -290,14 +452,11 @@ class MFRC522:
             if not ((i != 0) and not (n & 0x04)):
                 break
         
-        p_out_data = []
-        p_out_data.append(self._read_register(0x22))
-        p_out_data.append(self._read_register(0x21))
-        
-        return p_out_data
+        return bytearray(self._read_many_regs([0x22, 0x21]))
     
     def cleanup(self):
         """Clean up SPI"""
+        os.close(self._spi_fd)
         self.spi.close()
 
 class RFIDWelcomeSystem:
@@ -316,11 +475,12 @@ class RFIDWelcomeSystem:
             print(f"✗ RFID reader failed: {e}")
         
         # Initialize LCD display
+        self._lcd_lines = ["", ""]  # Last text written to each row
         try:
             self.lcd = LCD1602(LCD_I2C_ADDRESS)
             self.lcd.clear()
-            self.lcd.write(0, 0, "Welcome System")
-            self.lcd.write(1, 0, "Initializing...")
+            self._lcd_set(0, "Welcome System")
+            self._lcd_set(1, "Initializing...")
             self.has_lcd = True
             print("✓ LCD display initialized")
         except Exception as e:
@@ -361,6 +521,9 @@ class RFIDWelcomeSystem:
         
         # User database
         self.users = self.load_users()
+        self._users_dirty = False
+        self._state_lock = threading.Lock()  # Guards users and registration_mode
+        self._save_lock = threading.Lock()  # Serializes writes to USERS_FILE
         self.last_scanned_card = None
         self.last_scan_time = 0
         self.scan_cooldown = 3.0  # seconds between same card scans
@@ -369,6 +532,13 @@ class RFIDWelcomeSystem:
         self.greeting_modes = ["standard", "time_based", "custom", "silent"]
         self.current_mode = 0
         self.audio_muted = False
+        self._greeting_fns = {
+            "standard": self._greet_standard,
+            "time_based": self._greet_time_based,
+            "custom": self._greet_custom,
+            "silent": self._greet_silent
+        }
+        self._set_active_mode()
         
         # Registration state
         self.registration_mode = False
@@ -379,14 +549,58 @@ class RFIDWelcomeSystem:
         self.scan_count = 0
         self.successful_scans = 0
         self.unknown_cards = 0
-        self.scan_history = []
+        self.scan_history = deque(maxlen=SCAN_HISTORY_SIZE)
+        
+        # Append-only scan log, kept open (unbuffered: one write per scan)
+        try:
+            self._scan_log = open(SCAN_LOG_FILE, 'ab', buffering=0)
+        except OSError as e:
+            self._scan_log = None
+            print(f"✗ Scan log unavailable: {e}")
+        self._scans_today = 0
+        self._scans_today_date = datetime.now().date()
+        self._stats_version = 0      # Bumped whenever a statistic changes
+        self._stats_cache = None
+        self._stats_cache_version = -1
+        
+        # Persistent audio output stream (falls back to aplay per greeting)
+        self._stream = None
+        if SOUNDDEVICE_AVAILABLE:
+            try:
+                self._stream = sd.OutputStream(samplerate=TTS_SAMPLE_RATE, channels=1,
+                                               dtype='float32', blocksize=2048,
+                                               latency='high')
+                self._stream.start()
+                print("✓ Audio output stream opened")
+            except Exception as e:
+                self._stream = None
+                print(f"✗ Audio output stream failed: {e}")
+        
+        # Text-to-speech worker (keeps espeak off the scanning thread)
+        self._tts_q = queue.Queue(maxsize=4)
+        self._tts_lock = threading.Lock()
+        self._tts_pending = 0  # Greetings queued or playing, guarded by _tts_lock
+        self._playback_done = threading.Event()  # Set while nothing is queued or playing
+        self._playback_done.set()
+        threading.Thread(target=self._tts_worker, daemon=True).start()
         
         # Background scanning
         self.scanning_active = True
+        
+        # Deferred callbacks share one scheduler thread instead of Timers
+        self._sched = sched.scheduler(time.monotonic, self._sched_delay)
+        self._sched_wakeup = threading.Event()
+        self.sched_thread = threading.Thread(target=self._sched_runner, daemon=True)
+        self.sched_thread.start()
+        
         self.scan_thread = threading.Thread(target=self._scanning_loop, daemon=True)
         self.scan_thread.start()
         
-        # Display update thread
+        # Batched user database writes
+        self._schedule_users_flush()
+        
+        # Display update thread (woken early by _request_display_refresh)
+        self._display_event = threading.Event()
         self.display_thread = threading.Thread(target=self._display_loop, daemon=True)
         self.display_thread.start()
         
@@ -398,7 +612,7 @@ class RFIDWelcomeSystem:
         
         print("🎉 RFID Welcome System Initialized")
         print(f"Registered users: {len(self.users)}")
-        print(f"Mode: {self.greeting_modes[self.current_mode].upper()}")
+        print(f"Mode: {self._active_mode_label}")
     
     def _scanning_loop(self):
         """Main RFID scanning loop"""
@@ -414,7 +628,7 @@ class RFIDWelcomeSystem:
                         
                         if status == 0:
                             # Convert UID to string
-                            card_id = ''.join([f'{byte:02X}' for byte in uid])
+                            card_id = uid.hex().upper()
                             
                             # Check cooldown period
                             current_time = time.time()
@@ -431,26 +645,41 @@ class RFIDWelcomeSystem:
                 print(f"Scanning error: {e}")
                 time.sleep(1)
     
-    def _process_card_scan(self, card_id):
+    def _process_card_scan(self, card_id, speak=True):
         """Process scanned RFID card"""
+        with self._state_lock:
+            # Registration may have started while the card was being read
+            if self.registration_mode:
+                return
+            user = self.users.get(card_id)
+        
         self.scan_count += 1
         
+        # Single clock snapshot shared by the whole scan
+        now = datetime.now()
+        
+        # Running per-day counter (reset at midnight)
+        today = now.date()
+        if today != self._scans_today_date:
+            self._scans_today_date = today
+            self._scans_today = 0
+        self._scans_today += 1
+        
         # Log scan event
         scan_event = {
-            'timestamp': datetime.now().isoformat(),
+            'ts': now.timestamp(),
             'card_id': card_id,
             'mode': self.greeting_modes[self.current_mode]
         }
         
         # Check if user is registered
-        if card_id in self.users:
-            user = self.users[card_id]
+        if user is not None:
             self.successful_scans += 1
             scan_event['user'] = user['name']
             scan_event['status'] = 'success'
             
             print(f"👤 Card recognized: {user['name']}")
-            self._greet_user(user)
+            self._greet_user(user, now, speak)
         else:
             self.unknown_cards += 1
             scan_event['status'] = 'unknown'
@@ -458,19 +687,23 @@ class RFIDWelcomeSystem:
             print(f"❓ Unknown card: {card_id}")
             self._handle_unknown_card(card_id)
         
+        # Publish the scan's counters together, after all of them are updated
+        self._stats_version += 1
         self.scan_history.append(scan_event)
+        self._append_scan_event(scan_event)
     
-    def _greet_user(self, user):
+    def _greet_user(self, user, now, speak=True):
         """Greet registered user"""
         name = user['name']
-        custom_greeting = user.get('greeting', None)
-        last_seen = user.get('last_seen', None)
-        visits = user.get('visits', 0) + 1
+        custom_greeting = user['rendered_greeting']
         
         # Update user data
-        user['last_seen'] = datetime.now().isoformat()
-        user['visits'] = visits
-        self.save_users()
+        with self._state_lock:
+            last_seen = user.get('last_seen', None)
+            visits = user.get('visits', 0) + 1
+            user['last_seen'] = now.timestamp()
+            user['visits'] = visits
+            self._users_dirty = True
         
         # Visual feedback
         if self.has_indicators:
@@ -478,22 +711,22 @@ class RFIDWelcomeSystem:
             self.greeting_led.pulse()
         
         # Generate greeting based on mode
-        greeting = self._generate_greeting(name, custom_greeting, visits, last_seen)
+        greeting = self._generate_greeting(name, custom_greeting, visits, last_seen, now)
         
         # Display greeting
         if self.has_lcd:
-            self._display_greeting(name, greeting)
+            self._display_greeting(name, greeting, visits)
         
         # Audio feedback
         if not self.audio_muted:
             self._play_greeting_sound(user.get('sound_pattern', 'default'))
             
             # Text-to-speech if available
-            if user.get('tts_enabled', True):
-                self._speak_greeting(greeting)
+            if speak and user.get('tts_enabled', True):
+                self._speak_greeting(greeting, user)
         
         # Schedule cleanup
-        threading.Timer(5.0, self._clear_greeting).start()
+        self._schedule(5.0, self._clear_greeting)
     
     def _handle_unknown_card(self, card_id):
         """Handle unknown RFID card"""
@@ -502,70 +735,71 @@ class RFIDWelcomeSystem:
             self.alert_buzzer.beep(0.5, 0.5, n=2)  # Alert sound
         
         if self.has_lcd:
-            self.lcd.clear()
-            self.lcd.write(0, 0, "Unknown Card")
-            self.lcd.write(1, 0, "Not Registered")
+            self._lcd_set(0, "Unknown Card")
+            self._lcd_set(1, "Not Registered")
         
         # Auto-clear after delay
-        threading.Timer(3.0, self._clear_display).start()
+        self._schedule(3.0, self._clear_display)
     
-    def _generate_greeting(self, name, custom_greeting, visits, last_seen):
-        """Generate personalized greeting based on mode"""
+    def _set_active_mode(self):
+        """Cache greeting function and label for the current mode"""
         mode = self.greeting_modes[self.current_mode]
-        
-        if mode == "standard":
-            return f"Welcome, {name}!"
-        
-        elif mode == "time_based":
-            hour = datetime.now().hour
-            if 5 <= hour < 12:
-                return f"Good morning, {name}!"
-            elif 12 <= hour < 17:
-                return f"Good afternoon, {name}!"
-            elif 17 <= hour < 21:
-                return f"Good evening, {name}!"
-            else:
-                return f"Good night, {name}!"
-        
-        elif mode == "custom" and custom_greeting:
-            return custom_greeting.replace("{name}", name)
-        
-        elif mode == "silent":
-            return ""  # No verbal greeting
-        
-        else:
-            return f"Hello, {name}!"
+        self._active_mode_fn = self._greeting_fns.get(mode, self._greet_default)
+        self._active_mode_label = mode.upper()
     
-    def _display_greeting(self, name, greeting):
+    def _generate_greeting(self, name, custom_greeting, visits, last_seen, now):
+        """Generate personalized greeting based on mode"""
+        return self._active_mode_fn(name, custom_greeting, now)
+    
+    def _greet_standard(self, name, custom_greeting, now):
+        return f"Welcome, {name}!"
+    
+    def _greet_time_based(self, name, custom_greeting, now):
+        hour = now.hour
+        for start, end, salutation in _HOUR_BANDS:
+            if start <= hour < end:
+                return f"{salutation}, {name}!"
+        return f"Good night, {name}!"
+    
+    def _greet_custom(self, name, custom_greeting, now):
+        # custom_greeting is pre-rendered at registration/load time
+        return custom_greeting
+    
+    def _greet_silent(self, name, custom_greeting, now):
+        return ""  # No verbal greeting
+    
+    def _greet_default(self, name, custom_greeting, now):
+        return f"Hello, {name}!"
+    
+    def _display_greeting(self, name, greeting, visits):
         """Display greeting on LCD"""
         if not self.has_lcd:
             return
         
-        self.lcd.clear()
-        
         # Split greeting for two lines if needed
-        if len(greeting) <= 16:
-            self.lcd.write(0, 0, greeting)
-            self.lcd.write(1, 0, f"Visit #{self.users[self.last_scanned_card]['visits']}")
+        if len(greeting) <= LCD_WIDTH:
+            self._lcd_set(0, greeting)
+            self._lcd_set(1, f"Visit #{visits}")
         else:
             # Display name on first line, message on second
-            self.lcd.write(0, 0, f"Hi {name}!")
+            self._lcd_set(0, f"Hi {name}!")
             time_str = datetime.now().strftime("%H:%M")
-            self.lcd.write(1, 0, f"Welcome  {time_str}")
+            self._lcd_set(1, f"Welcome  {time_str}")
+    
+    def _lcd_set(self, row, text):
+        """Write an LCD row only if its content changed"""
+        # Pad to full width so stale characters are overwritten without clear()
+        text = text[:LCD_WIDTH].ljust(LCD_WIDTH)
+        if self._lcd_lines[row] != text:
+            self.lcd.write(row, 0, text)
+            self._lcd_lines[row] = text
     
     def _play_greeting_sound(self, pattern="default"):
         """Play greeting sound pattern"""
         if not self.has_indicators:
             return
         
-        patterns = {
-            'default': [(0.1, 0.1), (0.1, 0.1), (0.2, 0.0)],
-            'vip': [(0.1, 0.05)] * 5 + [(0.3, 0.0)],
-            'simple': [(0.2, 0.0)],
-            'melody': [(0.1, 0.1), (0.15, 0.1), (0.1, 0.1), (0.2, 0.0)]
-        }
-        
-        pattern_sequence = patterns.get(pattern, patterns['default'])
+        pattern_sequence = SOUND_PATTERNS.get(pattern, SOUND_PATTERNS['default'])
         
         def play_pattern():
             for duration, pause in pattern_sequence:
@@ -573,50 +807,225 @@ class RFIDWelcomeSystem:
         
         threading.Thread(target=play_pattern, daemon=True).start()
     
-    def _speak_greeting(self, greeting):
-        """Use text-to-speech for greeting (if available)"""
+    def _speak_greeting(self, greeting, user=None):
+        """Queue greeting for text-to-speech (if available)"""
         if not greeting:
             return
         
+        item = (greeting, user)
+        with self._tts_lock:
+            try:
+                self._tts_q.put_nowait(item)
+                self._tts_pending += 1
+            except queue.Full:
+                # Drop the oldest pending greeting to make room
+                try:
+                    self._tts_q.get_nowait()
+                    self._tts_pending -= 1
+                except queue.Empty:
+                    pass
+                try:
+                    self._tts_q.put_nowait(item)
+                    self._tts_pending += 1
+                except queue.Full:
+                    pass
+            
+            if self._tts_pending:
+                self._playback_done.clear()
+    
+    def _tts_worker(self):
+        """Speak queued greetings one at a time"""
+        while True:
+            greeting, user = self._tts_q.get()
+            try:
+                audio = self._cached_greeting_audio(greeting, user)
+                if audio:
+                    self._play_greeting(audio)
+                else:
+                    self._speak_segments(greeting)
+            except Exception as e:
+                print(f"✗ Greeting playback failed: {e}")
+            finally:
+                with self._tts_lock:
+                    self._tts_pending -= 1
+                    if not self._tts_pending:
+                        self._playback_done.set()
+    
+    def _speak_segments(self, greeting):
+        """Synthesize sentence by sentence, playing each while the next renders"""
+        segments = _split_text(greeting)
+        if len(segments) <= 1:
+            self._play_greeting(self._synthesize_greeting(greeting))
+            return
+        
+        segment_q = queue.Queue(maxsize=2)
+        
+        def synthesize_segments():
+            try:
+                for segment in segments:
+                    segment_q.put(self._synthesize_greeting(segment))
+            finally:
+                segment_q.put(None)  # End of greeting, even if synthesis failed
+        
+        threading.Thread(target=synthesize_segments, daemon=True).start()
+        
+        while True:
+            audio = segment_q.get()
+            if audio is None:
+                break
+            self._play_greeting(audio)
+    
+    def _cached_greeting_audio(self, greeting, user):
+        """Return the user's pre-synthesized audio if it matches greeting"""
+        if user is not None and user.get('audio_text') == greeting:
+            try:
+                with open(user['audio_path'], 'rb') as f:
+                    return f.read()
+            except OSError:
+                pass
+        return b''
+    
+    def _greeting_audio(self, greeting, user=None):
+        """Return WAV audio for greeting, from the user's cache when it matches"""
+        return self._cached_greeting_audio(greeting, user) or self._synthesize_greeting(greeting)
+    
+    def _cache_greeting_audio(self, card_id, user):
+        """Synthesize a user's rendered greeting once and store it on disk"""
+        greeting = user['rendered_greeting']
+        audio = self._synthesize_greeting(greeting)
+        if not audio:
+            return
+        
+        try:
+            os.makedirs(GREETING_AUDIO_DIR, exist_ok=True)
+            audio_path = os.path.join(GREETING_AUDIO_DIR, f'{card_id}.wav')
+            with open(audio_path, 'wb') as f:
+                f.write(audio)
+        except OSError as e:
+            print(f"Failed to cache greeting audio: {e}")
+            return
+        
+        # audio_text ties the file to the text it was rendered from
+        user['audio_path'] = audio_path
+        user['audio_text'] = greeting
+    
+    def _synthesize_greeting(self, greeting):
+        """Render greeting to WAV audio with espeak (empty if unavailable)"""
         try:
-            # Try to use espeak for TTS
-            subprocess.run(['espeak', greeting], 
-                         stdout=subprocess.DEVNULL, 
-                         stderr=subprocess.DEVNULL,
-                         timeout=5)
+            result = subprocess.run(['espeak', '--stdout', greeting],
+                                    stdout=subprocess.PIPE,
+                                    stderr=subprocess.DEVNULL,
+                                    timeout=5)
+            return result.stdout
         except:
             # TTS not available
+            return b''
+    
+    def _play_greeting(self, audio):
+        """Play synthesized greeting audio, blocking until it finishes"""
+        if not audio:
+            return
+        
+        if self._stream is not None:
+            samples = self._wav_to_samples(audio)
+            if samples is not None:
+                for start in range(0, len(samples), AUDIO_WRITE_BLOCK):
+                    self._stream.write(samples[start:start + AUDIO_WRITE_BLOCK].reshape(-1, 1))
+                return
+        
+        try:
+            subprocess.run(['aplay', '-q', '-'], input=audio,
+                           stdout=subprocess.DEVNULL,
+                           stderr=subprocess.DEVNULL,
+                           timeout=10)
+        except:
+            # Audio playback not available
             pass
     
+    def _wav_to_samples(self, audio):
+        """Decode 16-bit mono WAV bytes to faded float32 samples"""
+        try:
+            with wave.open(io.BytesIO(audio)) as wav:
+                if (wav.getframerate() != TTS_SAMPLE_RATE or
+                        wav.getnchannels() != 1 or wav.getsampwidth() != 2):
+                    return None
+                frames = wav.readframes(wav.getnframes())
+        except (wave.Error, EOFError):
+            return None
+        
+        samples = np.frombuffer(frames, dtype='<i2').astype(np.float32) / 32768.0
+        
+        fade = min(AUDIO_FADE_SAMPLES, len(samples) // 2)
+        if fade:
+            ramp = np.linspace(0.0, 1.0, fade, dtype=np.float32)
+            samples[:fade] *= ramp
+            samples[-fade:] *= ramp[::-1]
+        
+        return samples
+    
+    def _card_greeting_audio(self, card_id):
+        """Synthesize the spoken greeting a card would receive now"""
+        user = self.users.get(card_id)
+        if user is None or self.audio_muted or not user.get('tts_enabled', True):
+            return b''
+        
+        greeting = self._generate_greeting(user['name'], user['rendered_greeting'],
+                                           user.get('visits', 0) + 1,
+                                           user.get('last_seen', None), datetime.now())
+        if not greeting:
+            return b''
+        return self._greeting_audio(greeting, user)
+    
+    def _schedule(self, delay, action):
+        """Run action after delay seconds on the scheduler thread"""
+        self._sched.enter(delay, 1, action)
+        self._sched_wakeup.set()  # Re-evaluate the next deadline
+    
+    def _sched_delay(self, timeout):
+        """Scheduler sleep that returns early when a new event is added"""
+        self._sched_wakeup.wait(timeout)
+        self._sched_wakeup.clear()
+    
+    def _sched_runner(self):
+        """Run scheduled callbacks until the system shuts down"""
+        while self.scanning_active:
+            try:
+                self._sched.run()
+            except Exception as e:
+                print(f"Scheduled task error: {e}")
+            
+            if self.scanning_active and self._sched.empty():
+                self._sched_delay(None)  # Idle until something is scheduled
+    
     def _clear_greeting(self):
         """Clear greeting display and indicators"""
         if self.has_indicators:
             self.success_led.off()
             self.greeting_led.off()
         
-        self._update_display()
+        self._request_display_refresh()
     
     def _clear_display(self):
         """Clear error display"""
         if self.has_indicators:
             self.error_led.off()
         
-        self._update_display()
+        self._request_display_refresh()
     
     def _start_registration(self):
         """Start new user registration process"""
-        if self.registration_mode:
-            return
+        with self._state_lock:
+            if self.registration_mode:
+                return
+            self.registration_mode = True
         
         print("\n📝 Starting user registration...")
-        self.registration_mode = True
         self.registration_step = 0
         self.new_user_data = {}
         
         if self.has_lcd:
-            self.lcd.clear()
-            self.lcd.write(0, 0, "Registration")
-            self.lcd.write(1, 0, "Scan new card...")
+            self._lcd_set(0, "Registration")
+            self._lcd_set(1, "Scan new card...")
         
         if self.has_indicators:
             self.alert_buzzer.beep(0.1, 0.1, n=3)
@@ -625,63 +1034,67 @@ class RFIDWelcomeSystem:
                 led.blink(on_time=0.2, off_time=0.2, n=3, background=True)
         
         # Start registration timeout
-        threading.Timer(30.0, self._cancel_registration).start()
+        self._schedule(30.0, self._cancel_registration)
     
     def _cancel_registration(self):
         """Cancel registration if timeout"""
         if self.registration_mode:
             print("⏰ Registration timeout")
             self.registration_mode = False
-            self._update_display()
+            self._request_display_refresh()
             
             if self.has_indicators:
                 self.alert_buzzer.beep(0.5, 0.0, n=1)
     
     def _display_loop(self):
         """Background display update loop"""
-        display_cycle = 0
+        show_statistics = False
         
         while self.scanning_active:
             try:
+                # Sleep until a state change or the 3 second rotation
+                triggered = self._display_event.wait(3.0)
+                self._display_event.clear()
+                
                 if self.has_lcd and not self.registration_mode:
                     # Only update display if no active greeting
                     if not self.greeting_led.is_lit:
-                        if display_cycle % 60 == 0:  # Every 3 seconds
+                        if triggered or not show_statistics:
                             self._update_display()
-                        elif display_cycle % 120 == 60:
+                            show_statistics = True
+                        else:
                             self._show_statistics()
-                    
-                    display_cycle = (display_cycle + 1) % 120
-                
-                time.sleep(0.05)
+                            show_statistics = False
                 
             except Exception as e:
                 print(f"Display loop error: {e}")
                 time.sleep(1)
     
+    def _request_display_refresh(self):
+        """Wake the display loop to redraw the status screen"""
+        self._display_event.set()
+    
     def _update_display(self):
         """Update LCD with system status"""
         if not self.has_lcd:
             return
         
         try:
-            self.lcd.clear()
-            
             if self.registration_mode:
-                self.lcd.write(0, 0, "Registration")
-                self.lcd.write(1, 0, "Scan card...")
+                self._lcd_set(0, "Registration")
+                self._lcd_set(1, "Scan card...")
             else:
                 # Show welcome message and stats
-                self.lcd.write(0, 0, "RFID Welcome")
-                mode_char = {"standard": "S", "time_based": "T", 
-                           "custom": "C", "silent": "Q"}
-                mode_indicator = mode_char.get(self.greeting_modes[self.current_mode], "?")
+                self._lcd_set(0, "RFID Welcome")
+                mode_indicator = _MODE_CHAR.get(self.greeting_modes[self.current_mode], "?")
                 
                 users_count = len(self.users)
-                scans_today = sum(1 for scan in self.scan_history 
-                                if datetime.fromisoformat(scan['timestamp']).date() == datetime.now().date())
+                if self._scans_today_date == datetime.now().date():
+                    scans_today = self._scans_today
+                else:
+                    scans_today = 0
                 
-                self.lcd.write(1, 0, f"U:{users_count} S:{scans_today} [{mode_indicator}]")
+                self._lcd_set(1, f"U:{users_count} S:{scans_today} [{mode_indicator}]")
                 
         except Exception as e:
             print(f"Display update error: {e}")
@@ -692,12 +1105,10 @@ class RFIDWelcomeSystem:
             return
         
         try:
-            self.lcd.clear()
-            
             accuracy = (self.successful_scans / self.scan_count * 100) if self.scan_count > 0 else 0
             
-            self.lcd.write(0, 0, f"Scans: {self.scan_count}")
-            self.lcd.write(1, 0, f"Success: {accuracy:.0f}%")
+            self._lcd_set(0, f"Scans: {self.scan_count}")
+            self._lcd_set(1, f"Success: {accuracy:.0f}%")
             
         except Exception as e:
             print(f"Statistics display error: {e}")
@@ -705,21 +1116,24 @@ class RFIDWelcomeSystem:
     def _cycle_mode(self):
         """Cycle through greeting modes"""
         self.current_mode = (self.current_mode + 1) % len(self.greeting_modes)
+        self._set_active_mode()
+        self._stats_version += 1
         mode_name = self.greeting_modes[self.current_mode]
         
-        print(f"🔄 Mode: {mode_name.upper()}")
+        print(f"🔄 Mode: {self._active_mode_label}")
         
         if self.has_indicators:
             self.welcome_buzzer.beep(0.1, 0.1, n=self.current_mode + 1)
         
         if self.has_lcd:
-            self.lcd.clear()
-            self.lcd.write(0, 0, f"Mode: {mode_name}")
-            threading.Timer(2.0, self._update_display).start()
+            self._lcd_set(0, f"Mode: {mode_name}")
+            self._lcd_set(1, "")
+            self._schedule(2.0, self._request_display_refresh)
     
     def _toggle_mute(self):
         """Toggle audio mute"""
         self.audio_muted = not self.audio_muted
+        self._stats_version += 1
         
         print(f"🔇 Audio {'muted' if self.audio_muted else 'unmuted'}")
         
@@ -729,19 +1143,30 @@ class RFIDWelcomeSystem:
             else:
                 self.welcome_buzzer.beep(0.1, 0.1, n=2)  # Double beep for unmute
     
-    def register_card(self, card_id, name, custom_greeting=None):
-        """Register new RFID card"""
-        self.users[card_id] = {
+    def register_card(self, card_id, name, custom_greeting=None,
+                      sound_pattern='default', persist=True):
+        """Register new RFID card (persist=False defers the save to the caller)"""
+        user = {
             'name': name,
             'greeting': custom_greeting,
+            'rendered_greeting': _render_greeting(name, custom_greeting),
             'registered': datetime.now().isoformat(),
             'last_seen': None,
             'visits': 0,
-            'sound_pattern': 'default',
+            'sound_pattern': sound_pattern,
             'tts_enabled': True
         }
         
-        self.save_users()
+        # Synthesize greeting audio now so scans only have to read it back
+        self._cache_greeting_audio(card_id, user)
+        
+        with self._state_lock:
+            self.users[card_id] = user
+            self._users_dirty = True
+        self._stats_version += 1
+        
+        if persist:
+            self.save_users()
         print(f"✅ Registered {name} with card {card_id}")
         
         return True
@@ -749,11 +1174,11 @@ class RFIDWelcomeSystem:
     def load_users(self):
         """Load user database from file"""
         try:
-            with open('rfid_users.json', 'r') as f:
-                return json.load(f)
+            with open(USERS_FILE, 'rb') as f:
+                users = _json_loads(f.read())
         except FileNotFoundError:
             # Pre-populate with demo users
-            return {
+            users = {
                 'DEMO0001': {
                     'name': 'Alice',
                     'greeting': 'Welcome back, {name}! Have a great day!',
@@ -761,31 +1186,78 @@ class RFIDWelcomeSystem:
                     'visits': 0
                 }
             }
+        
+        for user in users.values():
+            # Render greeting templates once instead of on every scan
+            user['rendered_greeting'] = _render_greeting(user['name'], user.get('greeting'))
+            
+            # Migrate ISO last_seen strings from older databases to epoch floats
+            last_seen = user.get('last_seen')
+            if isinstance(last_seen, str):
+                user['last_seen'] = datetime.fromisoformat(last_seen).timestamp()
+        
+        return users
     
     def save_users(self):
         """Save user database to file"""
-        with open('rfid_users.json', 'w') as f:
-            json.dump(self.users, f, indent=2)
+        # One writer at a time: callers share the temp file, and a newer
+        # snapshot must not be overwritten by an older one
+        with self._save_lock:
+            # Serialize under the lock so a concurrent scan can't mutate mid-dump
+            with self._state_lock:
+                data = _json_dumps(self.users)
+                self._users_dirty = False
+            
+            # Write to a temp file and rename so a power cut can't truncate it
+            tmp_file = USERS_FILE + '.tmp'
+            with open(tmp_file, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_file, USERS_FILE)
+    
+    def _schedule_users_flush(self):
+        """Arm the next batched user database write"""
+        self._schedule(USERS_SAVE_INTERVAL, self._flush_users)
     
-    def save_scan_history(self):
-        """Save scan history to file"""
+    def _flush_users(self):
+        """Save user database if modified since the last write"""
+        if self._users_dirty:
+            try:
+                self.save_users()
+            except Exception as e:
+                print(f"Failed to save users: {e}")
+        
+        if self.scanning_active:
+            self._schedule_users_flush()
+    
+    def _append_scan_event(self, scan_event):
+        """Append one scan to the on-disk history log"""
+        if self._scan_log is None:
+            return
+        
         try:
-            with open('scan_history.json', 'w') as f:
-                json.dump(self.scan_history, f, indent=2)
+            # Timestamps are kept as epoch floats and formatted only here
+            entry = dict(scan_event)
+            entry['timestamp'] = datetime.fromtimestamp(entry.pop('ts')).isoformat()
+            
+            self._scan_log.write(_json_dumps(entry) + b'\n')
         except Exception as e:
-            print(f"Failed to save scan history: {e}")
+            print(f"Failed to log scan: {e}")
     
     def get_statistics(self):
-        """Get system statistics"""
-        return {
-            'total_scans': self.scan_count,
-            'successful_scans': self.successful_scans,
-            'unknown_cards': self.unknown_cards,
-            'registered_users': len(self.users),
-            'success_rate': (self.successful_scans / self.scan_count * 100) if self.scan_count > 0 else 0,
-            'current_mode': self.greeting_modes[self.current_mode],
-            'audio_muted': self.audio_muted
-        }
+        """Get system statistics (cached until a counter changes)"""
+        version = self._stats_version
+        if self._stats_cache_version != version:
+            self._stats_cache = {
+                'total_scans': self.scan_count,
+                'successful_scans': self.successful_scans,
+                'unknown_cards': self.unknown_cards,
+                'registered_users': len(self.users),
+                'success_rate': (self.successful_scans / self.scan_count * 100) if self.scan_count > 0 else 0,
+                'current_mode': self.greeting_modes[self.current_mode],
+                'audio_muted': self.audio_muted
+            }
+            self._stats_cache_version = version
+        return self._stats_cache
     
     def cleanup(self):
         """Clean up system resources"""
@@ -793,16 +1265,28 @@ class RFIDWelcomeSystem:
         
         # Stop scanning
         self.scanning_active = False
+        self._display_event.set()
+        
+        # Drop pending callbacks and release the scheduler thread
+        for event in self._sched.queue:
+            try:
+                self._sched.cancel(event)
+            except ValueError:
+                pass
+        self._sched_wakeup.set()
         
         # Wait for threads
         if self.scan_thread.is_alive():
             self.scan_thread.join(timeout=2)
         if self.display_thread.is_alive():
             self.display_thread.join(timeout=2)
+        if self.sched_thread.is_alive():
+            self.sched_thread.join(timeout=2)
         
-        # Save data
+        # Save data (scans are already on disk; users get a final snapshot)
         self.save_users()
-        self.save_scan_history()
+        if self._scan_log is not None:
+            self._scan_log.close()
         
         # Clear display
         if self.has_lcd:
@@ -817,6 +1301,13 @@ class RFIDWelcomeSystem:
                 led.off()
             self.welcome_buzzer.beep(0.2, 0.1, n=3)  # Shutdown sound
         
+        # Close audio output
+        if self._stream is not None:
+            # Let the last greeting finish instead of cutting it off
+            self._playback_done.wait(timeout=10)
+            self._stream.stop()
+            self._stream.close()
+        
         # Close hardware
         if self.has_rfid:
             self.rfid.cleanup()
@@ -834,15 +1325,13 @@ class RFIDWelcomeSystem:
             self.welcome_buzzer.close()
             self.alert_buzzer.close()
 
-def interactive_demo():
+def interactive_demo(system):
     """Interactive RFID welcome system demo"""
     print("\n🎉 Interactive RFID Welcome Demo")
     print("Scan RFID cards for personalized greetings")
     print("Press Ctrl+C to exit")
     
     try:
-        system = RFIDWelcomeSystem()
-        
         print(f"\n📋 Controls:")
         print("📝 REGISTER Button: Register new users")
         print("🔄 MODE Button: Cycle greeting modes")
@@ -862,9 +1351,7 @@ def interactive_demo():
             stats = system.get_statistics()
             elapsed = time.time() - start_time
             
-            mode_icon = {"standard": "📢", "time_based": "🕐", 
-                        "custom": "✨", "silent": "🔇"}
-            current_icon = mode_icon.get(stats['current_mode'], "🎉")
+            current_icon = _MODE_ICON.get(stats['current_mode'], "🎉")
             
             audio_status = "🔇" if stats['audio_muted'] else "🔊"
             scan_status = "🟢" if system.scan_led.is_lit else "⚫"
@@ -876,7 +1363,7 @@ def interactive_demo():
                   f"{audio_status} {scan_status} | "
                   f"Time: {elapsed:.0f}s", end='')
             
-            time.sleep(0.1)
+            time.sleep(0.5)
     
     except KeyboardInterrupt:
         print(f"\n\n📊 Session Summary:")
@@ -890,48 +1377,48 @@ def interactive_demo():
         print(f"\n👥 User Activity:")
         for card_id, user in system.users.items():
             visits = user.get('visits', 0)
-            last_seen = user.get('last_seen', 'Never')
-            if last_seen != 'Never':
-                last_seen = datetime.fromisoformat(last_seen).strftime('%H:%M:%S')
+            last_seen = user.get('last_seen')
+            if last_seen is None:
+                last_seen = 'Never'
+            else:
+                last_seen = time.strftime('%H:%M:%S', time.localtime(last_seen))
             print(f"  {user['name']}: {visits} visits (last: {last_seen})")
-    finally:
-        system.cleanup()
 
-def demo_registration():
+def demo_registration(system):
     """Demonstrate user registration process"""
     print("\n📝 RFID Registration Demo")
     
     try:
-        system = RFIDWelcomeSystem()
-        
         # Simulate registration of demo cards
         demo_users = [
-            ('DEMO0002', 'Bob', 'Hey {name}! Good to see you!'),
-            ('DEMO0003', 'Charlie', None),  # Use default greeting
-            ('DEMO0004', 'Diana', 'Welcome aboard, Captain {name}!')
+            ('DEMO0002', 'Bob', 'Hey {name}! Good to see you!', 'melody'),
+            ('DEMO0003', 'Charlie', None, 'default'),  # Use default greeting
+            ('DEMO0004', 'Diana', 'Welcome aboard, Captain {name}!', 'vip')
         ]
         
-        for card_id, name, greeting in demo_users:
+        for card_id, name, greeting, sound_pattern in demo_users:
             print(f"\nRegistering {name}...")
-            system.register_card(card_id, name, greeting)
-            
-            # Set custom properties
-            if name == 'Bob':
-                system.users[card_id]['sound_pattern'] = 'melody'
-            elif name == 'Diana':
-                system.users[card_id]['sound_pattern'] = 'vip'
-            
-            time.sleep(1)
+            system.register_card(card_id, name, greeting,
+                                 sound_pattern=sound_pattern, persist=False)
         
+        # One write for the whole batch
         system.save_users()
         print(f"\n✅ Registered {len(demo_users)} demo users")
         
-        # Simulate card scans
+        # Simulate card scans, synthesizing the next greeting while the
+        # current one plays
         print("\n🎬 Simulating card scans...")
-        for card_id, name, _ in demo_users:
-            print(f"\nScanning {name}'s card...")
-            system._process_card_scan(card_id)
-            time.sleep(5)  # Wait for greeting to complete
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            ahead = pool.submit(system._card_greeting_audio, demo_users[0][0])
+            
+            for i, (card_id, name, _, _) in enumerate(demo_users):
+                audio = ahead.result()
+                if i + 1 < len(demo_users):
+                    ahead = pool.submit(system._card_greeting_audio, demo_users[i + 1][0])
+                
+                print(f"\nScanning {name}'s card...")
+                system._process_card_scan(card_id, speak=False)
+                system._play_greeting(audio)
         
         # Show final statistics
         stats = system.get_statistics()
@@ -942,36 +1429,60 @@ def demo_registration():
         
     except KeyboardInterrupt:
         print("\nDemo interrupted")
-    finally:
-        system.cleanup()
+
+def _read_choice(selector, pending, prompt):
+    """Prompt and wait for a line on stdin (None on EOF)"""
+    print(prompt, end='', flush=True)
+    
+    # Read the raw fd the selector watches; going through the buffered
+    # sys.stdin would hide pasted lines from select(). Leftover lines stay
+    # in pending for the next prompt.
+    while b'\n' not in pending:
+        if not selector.select(timeout=0.5):
+            continue
+        chunk = os.read(STDIN_FD, 1024)
+        if not chunk:
+            if not pending:
+                return None
+            break  # Final line without a newline
+        pending += chunk
+    
+    line, _, rest = pending.partition(b'\n')
+    pending[:] = rest
+    return line.decode('utf-8', errors='replace').strip()
 
 def main():
     """Main program with menu"""
     signal.signal(signal.SIGINT, signal_handler)
     
-    print("RFID Welcome System")
-    print("==================")
-    print("🎉 Personalized Greeting System")
-    print("👤 User Recognition & Tracking")
-    print("🔊 Multi-Mode Greetings")
-    print("📊 Visit Statistics")
-    
-    while True:
-        print("\n\nSelect Demo Mode:")
-        print("1. Interactive welcome system")
-        print("2. User registration demo")
-        print("3. Exit")
-        
-        choice = input("\nEnter choice (1-3): ").strip()
-        
-        if choice == '1':
-            interactive_demo()
-        elif choice == '2':
-            demo_registration()
-        elif choice == '3':
-            break
-        else:
-            print("Invalid choice")
+    _write_raw(BANNER)
+    
+    selector = selectors.DefaultSelector()
+    selector.register(STDIN_FD, selectors.EVENT_READ)
+    pending = bytearray()  # Input read past the current line
+    
+    # One system instance shared by every demo run
+    system = RFIDWelcomeSystem()
+    
+    try:
+        while True:
+            _write_raw(MENU)
+            
+            choice = _read_choice(selector, pending, "\nEnter choice (1-3): ")
+            
+            if choice is None:
+                break
+            elif choice == '1':
+                interactive_demo(system)
+            elif choice == '2':
+                demo_registration(system)
+            elif choice == '3':
+                break
+            else:
+                print("Invalid choice")
+    finally:
+        selector.close()
+        system.cleanup()
     
     print("\nGoodbye!")
 
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Decode the parking sensor's binary zone change log
+
+Prints one JSON object per record with the timestamp, zone, distance,
+alert mode and mute state.
+
+Usage: python3 decode_log.py [parking_sensor_log.bin]
+"""
+
+import sys
+import json
+import struct
+from datetime import datetime
+
+# Must match LOG_RECORD and ZONE_LABELS in ultrasonic-parking-sensor.py
+LOG_RECORD = struct.Struct('<dBf?16s')
+ZONE_LABELS = ("Safe", "Caution", "Warning", "Danger", "Critical")
+
+def read_log(path):
+    """Yield each record in the log as a dict"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    
+    # Ignore a partially written trailing record
+    data = data[:len(data) - len(data) % LOG_RECORD.size]
+    for timestamp, zone, distance, muted, mode in LOG_RECORD.iter_unpack(data):
+        yield {
+            'timestamp': datetime.fromtimestamp(timestamp).isoformat(timespec='milliseconds'),
+            'zone': ZONE_LABELS[zone],
+            'distance': round(distance, 3),
+            'alert_mode': mode.rstrip(b'\0').decode(),
+            'muted': muted
+        }
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else "parking_sensor_log.bin"
+    try:
+        for entry in read_log(path):
+            print(json.dumps(entry))
+    except FileNotFoundError:
+        print(f"✗ Log file not found: {path}")
+        sys.exit(1)
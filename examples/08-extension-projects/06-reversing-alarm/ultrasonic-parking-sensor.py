@@ -8,13 +8,14 @@ Features multiple alert modes, LED indicators, and LCD display.
 """
 
 import time
-import threading
-import queue
+import asyncio
 import json
 import os
+import struct
 from datetime import datetime
-from statistics import mean, median
-from enum import Enum
+from collections import deque
+from enum import Enum, IntEnum
+from bisect import bisect_left
 from gpiozero import DistanceSensor, LED, PWMLED, Buzzer, Button
 import numpy as np
 
@@ -48,9 +49,19 @@ ADC_CS_PIN = 5
 ADC_CLK_PIN = 6
 ADC_DI_PIN = 16
 ADC_DO_PIN = 12
+ADC_POLL_INTERVAL = 0.5     # Potentiometer changes rarely; poll at 2 Hz
 
 # LCD Display
 LCD_I2C_ADDRESS = 0x27
+DISPLAY_ROTATE_INTERVAL = 3  # Seconds without a distance update before rotating info
+
+# Zone change log: fixed-size binary records, read with decode_log.py
+# (timestamp, zone index, distance, muted, alert mode name)
+LOG_FILE = "parking_sensor_log.bin"
+LOG_RECORD = struct.Struct('<dBf?16s')
+LOG_BUFFER_SIZE = 1000      # Most recent zone changes kept in memory
+LOG_FLUSH_INTERVAL = 10     # Seconds between batched file writes
+LOG_MAX_BYTES = 1_000_000   # Rotate to LOG_FILE.1 beyond this size
 
 # Distance Zones (in meters)
 ZONE_SAFE = 2.0         # > 2m: Safe
@@ -59,14 +70,46 @@ ZONE_WARNING = 0.5      # 0.5-1m: Warning
 ZONE_DANGER = 0.3       # < 0.3m: Danger
 ZONE_CRITICAL = 0.1     # < 0.1m: Critical
 
-# Alert Timing
-BEEP_PATTERNS = {
-    'safe': None,                                    # No beep
-    'caution': {'on': 0.5, 'off': 1.0},             # Slow beep
-    'warning': {'on': 0.3, 'off': 0.5},             # Medium beep
-    'danger': {'on': 0.2, 'off': 0.2},              # Fast beep
-    'critical': {'on': 0.1, 'off': 0.05}            # Very fast beep
-}
+# Zone boundaries in ascending order (CRITICAL, DANGER, WARNING, CAUTION)
+_ZONE_BOUNDS = (ZONE_CRITICAL, ZONE_DANGER, ZONE_WARNING, ZONE_CAUTION)
+
+# Alert Timing (indexed by DistanceZone)
+BEEP_PATTERNS_BY_ZONE = (
+    None,                                   # Safe: no beep
+    {'on': 0.5, 'off': 1.0},                # Caution: slow beep
+    {'on': 0.3, 'off': 0.5},                # Warning: medium beep
+    {'on': 0.2, 'off': 0.2},                # Danger: fast beep
+    {'on': 0.1, 'off': 0.05}                # Critical: very fast beep
+)
+
+ZONE_LABELS = ("Safe", "Caution", "Warning", "Danger", "Critical")
+_ZONE_CHARS = ("✓", "!", "⚠", "☢", "🚨")
+
+# LED states per zone: (green, yellow, orange, red mode), indexed by DistanceZone
+# Red mode: 0=off, 1=on, 2=pulse, 3=blink
+RED_OFF, RED_ON, RED_PULSE, RED_BLINK = range(4)
+LED_MASKS = (
+    (1, 0, 0, RED_OFF),      # Safe
+    (1, 1, 0, RED_OFF),      # Caution
+    (0, 1, 1, RED_OFF),      # Warning
+    (0, 0, 1, RED_PULSE),    # Danger
+    (0, 1, 1, RED_BLINK)     # Critical
+)
+LEDS_OFF_MASK = (0, 0, 0, RED_OFF)
+
+def _median5(a, b, c, d, e):
+    """Median of five values using six comparisons"""
+    if a > b:
+        a, b = b, a
+    if c > d:
+        c, d = d, c
+    # The smaller of the two pair minimums can't be the median; replace it with e
+    if a < c:
+        a, b = (e, b) if e < b else (b, e)
+    else:
+        c, d = (e, d) if e < d else (d, e)
+    return min(b, c) if a < c else min(a, d)
+
 
 class AlertMode(Enum):
     """Alert mode enumeration"""
@@ -76,13 +119,17 @@ class AlertMode(Enum):
     VISUAL = "Visual Only"
     EMERGENCY = "Emergency"
 
-class DistanceZone(Enum):
-    """Distance zone enumeration"""
-    SAFE = "Safe"
-    CAUTION = "Caution"
-    WARNING = "Warning"
-    DANGER = "Danger"
-    CRITICAL = "Critical"
+class DistanceZone(IntEnum):
+    """Distance zone enumeration, ordered by severity"""
+    SAFE = 0
+    CAUTION = 1
+    WARNING = 2
+    DANGER = 3
+    CRITICAL = 4
+    
+    @property
+    def label(self):
+        return ZONE_LABELS[self]
 
 class UltrasonicParkingSensor:
     """Main parking sensor system class"""
@@ -105,13 +152,24 @@ class UltrasonicParkingSensor:
         
         # Configuration
         self.sensitivity = 0.5  # Default sensitivity
+        self._last_adc_raw = -1
         self.smoothing_window = 5  # Distance averaging window
-        self.distance_history = []
+        self._hist_buf = np.empty(self.smoothing_window, dtype=np.float64)
+        self._hist_idx = 0
+        self._lp_y = None  # Low-pass filter state
         
         # Alert state
-        self.alert_active = False
         self.last_alert_time = 0
-        self.beep_thread = None
+        self.beep_task = None
+        self._flash_task = None
+        self._loop = None
+        self._alert_dispatch = {
+            AlertMode.STANDARD: self._start_standard_alert,
+            AlertMode.VOICE: self._start_voice_alert,
+            AlertMode.TONE: self._start_tone_alert,
+            AlertMode.VISUAL: lambda zone, pattern: None,  # Visual only - no audio
+            AlertMode.EMERGENCY: self._start_emergency_alert
+        }
         
         # Calibration
         self.calibration_offset = 0.0
@@ -121,17 +179,27 @@ class UltrasonicParkingSensor:
         # Statistics
         self.session_start = datetime.now()
         self.zone_times = {zone: 0 for zone in DistanceZone}
+        self._stats_zone = self.current_zone
+        self._zone_entry_t = time.monotonic()
         self.min_distance_recorded = float('inf')
         self.alert_count = 0
         
-        # Threading
+        # Event loop tasks
         self.monitoring_active = False
-        self.sensor_queue = queue.Queue()
-        self.display_queue = queue.Queue()
+        self.sensor_queue = asyncio.Queue()
+        self.display_queue = asyncio.Queue()
         
         # Load saved configuration
         self._load_configuration()
         
+        # Keep the zone log open for the whole session
+        try:
+            self._log_fp = open(LOG_FILE, 'ab')
+        except OSError as e:
+            print(f"⚠ Could not open log file: {e}")
+            self._log_fp = None
+        self._log_pending = deque(maxlen=LOG_BUFFER_SIZE)
+        
         print("✅ Parking sensor initialized")
     
     def _init_sensors(self):
@@ -164,6 +232,9 @@ class UltrasonicParkingSensor:
         self.buzzer = Buzzer(BUZZER_PIN)
         self.speaker = Buzzer(SPEAKER_PIN)  # Can produce different tones
         
+        # Non-PWM LEDs in LED_MASKS order
+        self._mask_leds = (self.led_green, self.led_yellow, self.led_orange)
+        
         # Initial state - all off
         self._all_leds_off()
         print("✓ Indicators initialized")
@@ -174,15 +245,30 @@ class UltrasonicParkingSensor:
         self.mute_button = Button(MUTE_BUTTON_PIN, pull_up=True, bounce_time=0.1)
         self.calibrate_button = Button(CALIBRATE_BUTTON_PIN, pull_up=True, bounce_time=0.1)
         
-        # Button callbacks
-        self.mode_button.when_pressed = self._cycle_alert_mode
-        self.mute_button.when_pressed = self._toggle_mute
+        # Button callbacks (gpiozero fires these on its own thread)
+        self.mode_button.when_pressed = self._from_button(self._cycle_alert_mode)
+        self.mute_button.when_pressed = self._from_button(self._toggle_mute)
         self.calibrate_button.when_pressed = self._calibrate_sensor
         
         print("✓ Controls initialized")
     
+    def _from_button(self, handler):
+        """Wrap a button handler so it runs on the event loop thread"""
+        def callback():
+            loop = self._loop
+            if loop and loop.is_running():
+                loop.call_soon_threadsafe(handler)
+            else:
+                handler()
+        return callback
+    
     def _init_display(self):
         """Initialize LCD display"""
+        # Last text written to each row; None forces a rewrite
+        self._last_lcd_lines = [None, None]
+        
+        # Rotating screens, each returning (line0, line1)
+        self._display_formatters = (self._fmt_status, self._fmt_stats, self._fmt_mode)
         try:
             self.lcd = LCD1602(LCD_I2C_ADDRESS)
             self.lcd.clear()
@@ -222,8 +308,8 @@ class UltrasonicParkingSensor:
         except Exception as e:
             print(f"⚠ Could not save configuration: {e}")
     
-    def run(self):
-        """Main system loop"""
+    async def run(self):
+        """Main system loop (run with asyncio.run)"""
         print("\n🚗 Parking sensor active!")
         print("Press MODE to change alert type")
         print("Press MUTE to toggle sound")
@@ -231,36 +317,40 @@ class UltrasonicParkingSensor:
         print("Press Ctrl+C to exit\n")
         
         self.monitoring_active = True
-        
-        # Start monitoring threads
-        sensor_thread = threading.Thread(target=self._sensor_monitoring_loop, daemon=True)
-        display_thread = threading.Thread(target=self._display_update_loop, daemon=True)
-        
-        sensor_thread.start()
-        display_thread.start()
+        self._loop = asyncio.get_running_loop()
+        self._zone_entry_t = time.monotonic()
         
         try:
-            while True:
-                # Update sensitivity from potentiometer
-                self._update_sensitivity()
-                
-                # Process any queued events
-                self._process_sensor_data()
-                
-                time.sleep(0.05)
-                
-        except KeyboardInterrupt:
-            print("\n\n⏹ Shutting down parking sensor...")
+            await asyncio.gather(
+                self._sensor_monitoring_loop(),
+                self._display_update_loop(),
+                self._sensitivity_loop(),
+                self._log_flush_loop(),
+                self._control_loop()
+            )
+        finally:
             self.monitoring_active = False
             self._stop_alert()
-            time.sleep(0.5)
     
-    def _sensor_monitoring_loop(self):
-        """Continuous sensor monitoring thread"""
+    async def _control_loop(self):
+        """Handle queued sensor events"""
+        while self.monitoring_active:
+            await self._process_sensor_data()
+    
+    async def _sensitivity_loop(self):
+        """Poll the sensitivity potentiometer at a slow rate"""
+        while self.monitoring_active:
+            self._update_sensitivity()
+            await asyncio.sleep(ADC_POLL_INTERVAL)
+    
+    async def _sensor_monitoring_loop(self):
+        """Continuous sensor monitoring task"""
+        loop = asyncio.get_running_loop()
         while self.monitoring_active:
             try:
-                # Get current distance reading
-                raw_distance = self.ultrasonic.distance
+                # Get current distance reading off the event loop
+                raw_distance = await loop.run_in_executor(
+                    None, lambda: self.ultrasonic.distance)
                 
                 # Apply calibration offset
                 distance = raw_distance + self.calibration_offset
@@ -269,17 +359,16 @@ class UltrasonicParkingSensor:
                 distance = max(self.min_detection_distance, 
                              min(distance, self.max_detection_distance))
                 
-                # Add to history for smoothing
-                self.distance_history.append(distance)
-                if len(self.distance_history) > self.smoothing_window:
-                    self.distance_history.pop(0)
-                
                 # Calculate smoothed distance
-                if len(self.distance_history) >= 3:
-                    # Use median for noise reduction
-                    smoothed_distance = median(self.distance_history)
+                smoothed_distance = self._smooth_distance(distance)
+                
+                # One-pole low-pass; higher sensitivity responds faster
+                alpha = 0.2 + 0.6 * self.sensitivity
+                if self._lp_y is None:
+                    self._lp_y = smoothed_distance
                 else:
-                    smoothed_distance = distance
+                    self._lp_y = alpha * smoothed_distance + (1 - alpha) * self._lp_y
+                smoothed_distance = self._lp_y
                 
                 # Update current distance
                 self.current_distance = smoothed_distance
@@ -290,53 +379,70 @@ class UltrasonicParkingSensor:
                 # Check for zone change
                 if new_zone != self.current_zone:
                     self.current_zone = new_zone
-                    self.sensor_queue.put({
+                    self.sensor_queue.put_nowait({
                         'type': 'zone_change',
                         'zone': new_zone,
                         'distance': smoothed_distance
                     })
                 
-                # Update statistics
-                self._update_statistics(smoothed_distance)
+                # Track minimum distance
+                if smoothed_distance < self.min_distance_recorded:
+                    self.min_distance_recorded = smoothed_distance
                 
                 # Small delay to prevent CPU overload
-                time.sleep(0.05)
+                await asyncio.sleep(0.05)
                 
             except Exception as e:
                 print(f"⚠ Sensor error: {e}")
-                time.sleep(0.1)
+                await asyncio.sleep(0.1)
+    
+    def _smooth_distance(self, distance):
+        """Add a reading to the ring buffer and return the filtered distance"""
+        self._hist_buf[self._hist_idx % self.smoothing_window] = distance
+        self._hist_idx += 1
+        n = min(self._hist_idx, self.smoothing_window)
+        if n < 3:
+            return distance
+        
+        # Reject outliers outside 1.5x the interquartile range, then median
+        window = self._hist_buf[:n]
+        q1, q3 = np.percentile(window, [25, 75])
+        spread = 1.5 * (q3 - q1)
+        valid = window[(window >= q1 - spread) & (window <= q3 + spread)]
+        if valid.size == 5:
+            return _median5(*valid.tolist())
+        return float(np.median(valid if valid.size else window))
     
     def _get_distance_zone(self, distance):
         """Determine zone based on distance"""
-        if distance <= ZONE_CRITICAL:
-            return DistanceZone.CRITICAL
-        elif distance <= ZONE_DANGER:
-            return DistanceZone.DANGER
-        elif distance <= ZONE_WARNING:
-            return DistanceZone.WARNING
-        elif distance <= ZONE_CAUTION:
-            return DistanceZone.CAUTION
-        else:
-            return DistanceZone.SAFE
+        # Count of boundaries below distance; each one crossed is one zone safer
+        return DistanceZone(DistanceZone.CRITICAL - bisect_left(_ZONE_BOUNDS, distance))
     
-    def _process_sensor_data(self):
+    async def _process_sensor_data(self):
         """Process sensor queue data"""
-        try:
-            while not self.sensor_queue.empty():
+        # Let the queue provide the wait, then drain whatever else arrived
+        data = await self.sensor_queue.get()
+        
+        while True:
+            if data['type'] == 'zone_change':
+                self._handle_zone_change(data['zone'], data['distance'])
+            try:
                 data = self.sensor_queue.get_nowait()
-                
-                if data['type'] == 'zone_change':
-                    self._handle_zone_change(data['zone'], data['distance'])
-                    
-        except queue.Empty:
-            pass
+            except asyncio.QueueEmpty:
+                return
     
     def _handle_zone_change(self, new_zone, distance):
         """Handle zone transitions"""
-        print(f"📍 Zone: {new_zone.value} ({distance:.2f}m)")
+        print(f"📍 Zone: {new_zone.label} ({distance:.2f}m)")
+        
+        # Credit the time spent in the zone we are leaving
+        now = time.monotonic()
+        self.zone_times[self._stats_zone] += now - self._zone_entry_t
+        self._stats_zone = new_zone
+        self._zone_entry_t = now
         
         # Update display
-        self.display_queue.put({
+        self.display_queue.put_nowait({
             'zone': new_zone,
             'distance': distance
         })
@@ -352,30 +458,31 @@ class UltrasonicParkingSensor:
     
     def _update_led_indicators(self, zone):
         """Update LED indicators based on zone"""
-        # Turn off all LEDs first
-        self._all_leds_off()
-        
-        # Turn on appropriate LEDs
-        if zone == DistanceZone.SAFE:
-            self.led_green.on()
-        elif zone == DistanceZone.CAUTION:
-            self.led_green.on()
-            self.led_yellow.on()
-        elif zone == DistanceZone.WARNING:
-            self.led_yellow.on()
-            self.led_orange.on()
-        elif zone == DistanceZone.DANGER:
-            self.led_orange.on()
+        mask = LED_MASKS[zone]
+        current = self._current_led_mask
+        
+        # Only write the LEDs whose state actually changes
+        for led, was_on, is_on in zip(self._mask_leds, current, mask):
+            if was_on != is_on:
+                led.value = is_on
+        if current[3] != mask[3]:
+            self._set_red_mode(mask[3])
+        self._current_led_mask = mask
+        
+        # Emergency stop consideration
+        if zone == DistanceZone.CRITICAL and self.alert_mode == AlertMode.EMERGENCY:
+            self._trigger_emergency_stop()
+    
+    def _set_red_mode(self, mode):
+        """Drive the red PWM LED: off, on, pulsing or blinking"""
+        if mode == RED_PULSE:
             self.led_red.pulse(fade_in_time=0.2, fade_out_time=0.2)
-        elif zone == DistanceZone.CRITICAL:
-            # All LEDs on, red flashing rapidly
-            self.led_yellow.on()
-            self.led_orange.on()
+        elif mode == RED_BLINK:
             self.led_red.blink(on_time=0.1, off_time=0.1)
-            
-            # Emergency stop consideration
-            if self.alert_mode == AlertMode.EMERGENCY:
-                self._trigger_emergency_stop()
+        elif mode == RED_ON:
+            self.led_red.on()
+        else:
+            self.led_red.off()
     
     def _all_leds_off(self):
         """Turn off all LED indicators"""
@@ -383,6 +490,7 @@ class UltrasonicParkingSensor:
         self.led_yellow.off()
         self.led_orange.off()
         self.led_red.off()
+        self._current_led_mask = LEDS_OFF_MASK
     
     def _update_alert_pattern(self, zone):
         """Update audio alert pattern based on zone"""
@@ -393,39 +501,26 @@ class UltrasonicParkingSensor:
             return
         
         # Get beep pattern for zone
-        pattern = BEEP_PATTERNS.get(zone.value.lower())
+        pattern = BEEP_PATTERNS_BY_ZONE[zone]
         if not pattern:
             return
         
         # Start new alert pattern
-        self.alert_active = True
         self.alert_count += 1
-        
-        if self.alert_mode == AlertMode.STANDARD:
-            self._start_standard_alert(pattern)
-        elif self.alert_mode == AlertMode.VOICE:
-            self._start_voice_alert(zone)
-        elif self.alert_mode == AlertMode.TONE:
-            self._start_tone_alert(zone)
-        elif self.alert_mode == AlertMode.VISUAL:
-            # Visual only - no audio
-            pass
-        elif self.alert_mode == AlertMode.EMERGENCY:
-            self._start_emergency_alert(zone)
+        self._alert_dispatch[self.alert_mode](zone, pattern)
     
-    def _start_standard_alert(self, pattern):
+    def _start_standard_alert(self, zone, pattern):
         """Start standard beep alert"""
-        def beep_loop():
-            while self.alert_active and not self.muted:
+        async def beep_loop():
+            while not self.muted:
                 self.buzzer.on()
-                time.sleep(pattern['on'])
+                await asyncio.sleep(pattern['on'])
                 self.buzzer.off()
-                time.sleep(pattern['off'])
+                await asyncio.sleep(pattern['off'])
         
-        self.beep_thread = threading.Thread(target=beep_loop, daemon=True)
-        self.beep_thread.start()
+        self._start_beep_task(beep_loop())
     
-    def _start_voice_alert(self, zone):
+    def _start_voice_alert(self, zone, pattern):
         """Start voice announcement alert"""
         # This would use text-to-speech in a real implementation
         # For now, use different beep patterns
@@ -436,22 +531,19 @@ class UltrasonicParkingSensor:
             DistanceZone.CRITICAL: [(0.05, 0.05)] * 8
         }
         
-        def voice_loop():
+        async def voice_loop():
             pattern = voice_patterns.get(zone, [(0.2, 0.5)])
-            while self.alert_active and not self.muted:
+            while not self.muted:
                 for on_time, off_time in pattern:
-                    if not self.alert_active or self.muted:
-                        break
                     self.speaker.on()
-                    time.sleep(on_time)
+                    await asyncio.sleep(on_time)
                     self.speaker.off()
-                    time.sleep(off_time)
-                time.sleep(0.5)  # Pause between announcements
+                    await asyncio.sleep(off_time)
+                await asyncio.sleep(0.5)  # Pause between announcements
         
-        self.beep_thread = threading.Thread(target=voice_loop, daemon=True)
-        self.beep_thread.start()
+        self._start_beep_task(voice_loop())
     
-    def _start_tone_alert(self, zone):
+    def _start_tone_alert(self, zone, pattern):
         """Start musical tone alert"""
         # Different tones for different zones
         tone_frequencies = {
@@ -469,44 +561,45 @@ class UltrasonicParkingSensor:
             DistanceZone.CRITICAL: (0.02, 0.1)
         }
         
-        def tone_loop():
+        async def tone_loop():
             on_time, off_time = tone_patterns.get(zone, (0.1, 0.5))
-            while self.alert_active and not self.muted:
+            while not self.muted:
                 # In real implementation, would generate actual tone
                 self.speaker.on()
-                time.sleep(on_time)
+                await asyncio.sleep(on_time)
                 self.speaker.off()
-                time.sleep(off_time)
+                await asyncio.sleep(off_time)
         
-        self.beep_thread = threading.Thread(target=tone_loop, daemon=True)
-        self.beep_thread.start()
+        self._start_beep_task(tone_loop())
     
-    def _start_emergency_alert(self, zone):
+    def _start_emergency_alert(self, zone, pattern):
         """Start emergency alert pattern"""
         if zone == DistanceZone.CRITICAL:
             # Continuous alarm for critical zone
-            def emergency_loop():
-                while self.alert_active and not self.muted:
+            async def emergency_loop():
+                while not self.muted:
                     self.buzzer.on()
                     self.speaker.on()
-                    time.sleep(0.1)
+                    await asyncio.sleep(0.1)
                     self.buzzer.off()
                     self.speaker.off()
-                    time.sleep(0.05)
+                    await asyncio.sleep(0.05)
             
-            self.beep_thread = threading.Thread(target=emergency_loop, daemon=True)
-            self.beep_thread.start()
+            self._start_beep_task(emergency_loop())
         else:
             # Use standard alert for other zones
-            pattern = BEEP_PATTERNS.get(zone.value.lower())
-            if pattern:
-                self._start_standard_alert(pattern)
+            self._start_standard_alert(zone, pattern)
+    
+    def _start_beep_task(self, coro):
+        """Schedule an alert coroutine on the event loop"""
+        self.beep_task = asyncio.create_task(coro, name="parking:beep")
     
     def _stop_alert(self):
         """Stop current alert"""
-        self.alert_active = False
-        if self.beep_thread:
-            self.beep_thread.join(timeout=0.5)
+        # Cancellation lands at the task's next await, so no join is needed
+        if self.beep_task:
+            self.beep_task.cancel()
+            self.beep_task = None
         self.buzzer.off()
         self.speaker.off()
     
@@ -517,48 +610,61 @@ class UltrasonicParkingSensor:
             print("🚨 EMERGENCY STOP TRIGGERED!")
             # In real implementation, would engage brakes or stop motor
             
-            # Flash all LEDs
+            # Flash all LEDs without blocking distance sampling
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                asyncio.run_coroutine_threadsafe(self._emergency_flash(), self._loop)
+            else:
+                self._flash_task = asyncio.create_task(
+                    self._emergency_flash(), name="parking:flash")
+    
+    async def _emergency_flash(self):
+        """Flash all LEDs, then hand them back to the zone indicators"""
+        try:
             for _ in range(5):
                 self._all_leds_off()
-                time.sleep(0.1)
+                await asyncio.sleep(0.1)
                 self.led_red.on()
                 self.led_orange.on()
                 self.led_yellow.on()
-                time.sleep(0.1)
+                await asyncio.sleep(0.1)
             
+            # Flash leaves yellow, orange and solid red lit
+            self._current_led_mask = (0, 1, 1, RED_ON)
+            if self.current_zone != DistanceZone.CRITICAL:
+                self._update_led_indicators(self.current_zone)
+        finally:
             self.emergency_stop = False
     
-    def _display_update_loop(self):
-        """LCD display update thread"""
+    async def _display_update_loop(self):
+        """LCD display update task"""
         last_update = 0
         display_mode = 0
         
         while self.monitoring_active:
             try:
-                # Check for display updates
+                # Wait for a display update until the rotation is due
+                timeout = max(0, DISPLAY_ROTATE_INTERVAL - (time.time() - last_update))
                 try:
-                    update = self.display_queue.get_nowait()
-                    self._update_main_display(update['zone'], update['distance'])
+                    update = await asyncio.wait_for(self.display_queue.get(), timeout)
                     last_update = time.time()
-                except queue.Empty:
+                    self._update_main_display(update['zone'], update['distance'])
+                    continue
+                except asyncio.TimeoutError:
                     pass
                 
-                # Rotate display information every 3 seconds
-                if time.time() - last_update > 3:
-                    if display_mode == 0:
-                        self._show_status_display()
-                    elif display_mode == 1:
-                        self._show_statistics_display()
-                    elif display_mode == 2:
-                        self._show_mode_display()
-                    
-                    display_mode = (display_mode + 1) % 3
-                    last_update = time.time()
-                
-                time.sleep(0.1)
+                # Rotate display information; advance first so an LCD
+                # error cannot leave the rotation due on every pass
+                last_update = time.time()
+                mode = display_mode
+                display_mode = (display_mode + 1) % len(self._display_formatters)
+                if self.lcd:
+                    self._write_lcd_lines(*self._display_formatters[mode]())
                 
             except Exception as e:
                 print(f"⚠ Display error: {e}")
+                await asyncio.sleep(0.1)
     
     def _update_main_display(self, zone, distance):
         """Update main distance display"""
@@ -566,79 +672,49 @@ class UltrasonicParkingSensor:
             return
         
         try:
-            # Zone indicators
-            zone_chars = {
-                DistanceZone.SAFE: "✓",
-                DistanceZone.CAUTION: "!",
-                DistanceZone.WARNING: "⚠",
-                DistanceZone.DANGER: "☢",
-                DistanceZone.CRITICAL: "🚨"
-            }
-            
             # Format distance display
             if distance < 1.0:
                 dist_str = f"{distance*100:.0f}cm"
             else:
                 dist_str = f"{distance:.2f}m"
             
-            # Update LCD
-            self.lcd.clear()
-            zone_char = zone_chars.get(zone, "?")
-            self.lcd.write(0, 0, f"{zone_char} {zone.value:<8}")
-            self.lcd.write(1, 0, f"Dist: {dist_str}")
-            
-            # Add mute indicator
-            if self.muted:
-                self.lcd.write(1, 14, "🔇")
+            self._write_lcd_lines(
+                f"{_ZONE_CHARS[zone]} {zone.label}",
+                self._with_mute_indicator(f"Dist: {dist_str}")
+            )
                 
         except Exception as e:
             print(f"⚠ Display update error: {e}")
     
-    def _show_status_display(self):
-        """Show system status on LCD"""
-        if not self.lcd:
-            return
-        
-        try:
-            self.lcd.clear()
-            self.lcd.write(0, 0, f"Mode: {self.alert_mode.value[:10]}")
-            self.lcd.write(1, 0, f"Sens: {self.sensitivity*100:.0f}%")
-            if self.muted:
-                self.lcd.write(1, 14, "🔇")
-        except:
-            pass
+    def _with_mute_indicator(self, text):
+        """Reserve the last columns of a row for the mute indicator"""
+        return f"{text:<14}🔇" if self.muted else text
     
-    def _show_statistics_display(self):
-        """Show statistics on LCD"""
-        if not self.lcd:
-            return
-        
-        try:
-            runtime = (datetime.now() - self.session_start).total_seconds()
-            runtime_min = int(runtime / 60)
-            
-            self.lcd.clear()
-            self.lcd.write(0, 0, f"Alerts: {self.alert_count}")
-            self.lcd.write(1, 0, f"Time: {runtime_min}min")
-        except:
-            pass
+    def _write_lcd_lines(self, line0, line1):
+        """Write both LCD rows, skipping rows whose text hasn't changed"""
+        # Pad to full width so a shorter line overwrites the previous one
+        for row, text in enumerate((f"{line0:<16}", f"{line1:<16}")):
+            if text != self._last_lcd_lines[row]:
+                self.lcd.write(row, 0, text)
+                self._last_lcd_lines[row] = text
     
-    def _show_mode_display(self):
-        """Show current operating mode"""
-        if not self.lcd:
-            return
-        
-        try:
-            if self.current_distance:
-                dist_str = f"{self.current_distance:.2f}m"
-            else:
-                dist_str = "---"
-            
-            self.lcd.clear()
-            self.lcd.write(0, 0, "Parking Sensor")
-            self.lcd.write(1, 0, f"Active: {dist_str}")
-        except:
-            pass
+    def _fmt_status(self):
+        """System status screen lines"""
+        return (f"Mode: {self.alert_mode.value[:10]}",
+                self._with_mute_indicator(f"Sens: {self.sensitivity*100:.0f}%"))
+    
+    def _fmt_stats(self):
+        """Statistics screen lines"""
+        runtime_min = int((datetime.now() - self.session_start).total_seconds() / 60)
+        return f"Alerts: {self.alert_count}", f"Time: {runtime_min}min"
+    
+    def _fmt_mode(self):
+        """Operating mode screen lines"""
+        if self.current_distance:
+            dist_str = f"{self.current_distance:.2f}m"
+        else:
+            dist_str = "---"
+        return "Parking Sensor", f"Active: {dist_str}"
     
     def _cycle_alert_mode(self):
         """Cycle through alert modes"""
@@ -650,7 +726,7 @@ class UltrasonicParkingSensor:
         print(f"🔔 Alert mode: {self.alert_mode.value}")
         
         # Update display
-        self.display_queue.put({
+        self.display_queue.put_nowait({
             'zone': self.current_zone,
             'distance': self.current_distance or 0
         })
@@ -675,7 +751,7 @@ class UltrasonicParkingSensor:
             self.buzzer.beep(0.1, 0.1, n=1)
         
         # Update display
-        self.display_queue.put({
+        self.display_queue.put_nowait({
             'zone': self.current_zone,
             'distance': self.current_distance or 0
         })
@@ -705,20 +781,25 @@ class UltrasonicParkingSensor:
             if self.lcd and i % 5 == 0:
                 self.lcd.write(1, 0, f"Progress: {i*5}%  ")
         
-        # Calculate calibration offset
-        avg_distance = mean(readings)
+        # Median is robust to the occasional ultrasonic glitch
+        arr = np.asarray(readings, dtype=np.float64)
+        med_distance = float(np.median(arr))
+        noise = float(np.std(arr))
         
         # Assume clear area should read as max distance
-        self.calibration_offset = self.max_detection_distance - avg_distance
+        self.calibration_offset = self.max_detection_distance - med_distance
         
         print(f"✓ Calibration complete")
-        print(f"  Average reading: {avg_distance:.2f}m")
+        print(f"  Median reading: {med_distance:.2f}m (std {noise*100:.1f}cm)")
+        if noise > 0.05:
+            print("⚠ High noise, consider recalibrating")
         print(f"  Calibration offset: {self.calibration_offset:+.2f}m")
         
         if self.lcd:
             self.lcd.clear()
             self.lcd.write(0, 0, "Calibrated!")
             self.lcd.write(1, 0, f"Offset: {self.calibration_offset:+.2f}m")
+            self._last_lcd_lines = [None, None]
         
         # Save configuration
         self._save_configuration()
@@ -738,6 +819,11 @@ class UltrasonicParkingSensor:
             # Read ADC value (0-255)
             adc_value = self.adc.read(0)
             
+            # Ignore 1 LSB of jitter
+            if abs(adc_value - self._last_adc_raw) <= 1:
+                return
+            self._last_adc_raw = adc_value
+            
             # Convert to sensitivity (0.1 to 1.0)
             self.sensitivity = 0.1 + (adc_value / 255) * 0.9
             
@@ -745,30 +831,45 @@ class UltrasonicParkingSensor:
             # Keep current sensitivity on error
             pass
     
-    def _update_statistics(self, distance):
-        """Update running statistics"""
-        # Track minimum distance
-        if distance < self.min_distance_recorded:
-            self.min_distance_recorded = distance
-        
-        # Track time in each zone
-        # This is simplified - in reality would track actual time spent
-        self.zone_times[self.current_zone] += 0.05  # Loop interval
-    
     def _log_zone_change(self, zone, distance):
         """Log zone changes to file"""
+        if not self._log_fp:
+            return
+        
+        # Record raw values now; formatting waits until the batch is written
+        self._log_pending.append(
+            (time.time(), zone, distance, self.alert_mode, self.muted))
+    
+    def _take_log_pending(self):
+        """Swap out the buffered zone changes for writing"""
+        pending = self._log_pending
+        self._log_pending = deque(maxlen=LOG_BUFFER_SIZE)
+        return pending
+    
+    async def _log_flush_loop(self):
+        """Periodically write buffered zone changes off the event loop"""
+        loop = asyncio.get_running_loop()
+        while self.monitoring_active:
+            await asyncio.sleep(LOG_FLUSH_INTERVAL)
+            if self._log_fp and self._log_pending:
+                await loop.run_in_executor(
+                    None, self._flush_log, self._take_log_pending())
+    
+    def _flush_log(self, entries):
+        """Write zone change entries to the log file, rotating when full"""
+        if not entries:
+            return
+        
         try:
-            log_entry = {
-                'timestamp': datetime.now().isoformat(),
-                'zone': zone.value,
-                'distance': round(distance, 3),
-                'alert_mode': self.alert_mode.value,
-                'muted': self.muted
-            }
+            self._log_fp.write(b''.join(
+                LOG_RECORD.pack(timestamp, zone, distance, muted, mode.value.encode())
+                for timestamp, zone, distance, mode, muted in entries))
+            self._log_fp.flush()
             
-            with open('parking_sensor_log.json', 'a') as f:
-                json.dump(log_entry, f)
-                f.write('\n')
+            if self._log_fp.tell() > LOG_MAX_BYTES:
+                self._log_fp.close()
+                os.replace(LOG_FILE, LOG_FILE + '.1')
+                self._log_fp = open(LOG_FILE, 'ab')
         except:
             pass
     
@@ -783,12 +884,14 @@ class UltrasonicParkingSensor:
             'zone_percentages': {}
         }
         
-        # Calculate zone percentages
-        total_zone_time = sum(self.zone_times.values())
+        # Calculate zone percentages, including the zone we are still in
+        zone_times = dict(self.zone_times)
+        zone_times[self._stats_zone] += time.monotonic() - self._zone_entry_t
+        total_zone_time = sum(zone_times.values())
         if total_zone_time > 0:
-            for zone, time_spent in self.zone_times.items():
+            for zone, time_spent in zone_times.items():
                 percentage = (time_spent / total_zone_time) * 100
-                stats['zone_percentages'][zone.value] = round(percentage, 1)
+                stats['zone_percentages'][zone.label] = round(percentage, 1)
         
         return stats
     
@@ -830,16 +933,17 @@ class UltrasonicParkingSensor:
         self.mute_button.close()
         self.calibrate_button.close()
         
+        if self._log_fp:
+            self._flush_log(self._take_log_pending())
+            self._log_fp.close()
+            self._log_fp = None
+        
         print("\n✅ Cleanup complete")
 
 
-def parking_demo():
-    """Demonstrate parking sensor features"""
-    print("\n🎮 Parking Sensor Demo")
-    print("=" * 50)
-    
-    sensor = UltrasonicParkingSensor()
-    
+async def _run_demo(sensor):
+    """Walk the sensor through a simulated parking approach"""
+    sensor._loop = asyncio.get_running_loop()
     try:
         # Simulate different distances
         demo_distances = [
@@ -860,7 +964,8 @@ def parking_demo():
             print(f"📏 Distance: {distance}m - {description}")
             
             # Simulate the distance reading
-            sensor.distance_history = [distance] * sensor.smoothing_window
+            sensor._hist_buf.fill(distance)
+            sensor._hist_idx = sensor.smoothing_window
             sensor.current_distance = distance
             
             # Get zone and handle change
@@ -868,10 +973,22 @@ def parking_demo():
             sensor._handle_zone_change(zone, distance)
             
             # Wait to observe the alert
-            time.sleep(3)
+            await asyncio.sleep(3)
         
         print("\n✅ Demo complete!")
-        
+    finally:
+        sensor._stop_alert()
+
+
+def parking_demo():
+    """Demonstrate parking sensor features"""
+    print("\n🎮 Parking Sensor Demo")
+    print("=" * 50)
+    
+    sensor = UltrasonicParkingSensor()
+    
+    try:
+        asyncio.run(_run_demo(sensor))
     finally:
         sensor.cleanup()
 
@@ -907,6 +1024,8 @@ if __name__ == "__main__":
         # Normal operation
         sensor = UltrasonicParkingSensor()
         try:
-            sensor.run()
+            asyncio.run(sensor.run())
+        except KeyboardInterrupt:
+            print("\n\n⏹ Shutting down parking sensor...")
         finally:
             sensor.cleanup()
\ No newline at end of file
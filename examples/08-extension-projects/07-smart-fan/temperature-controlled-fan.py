@@ -7,15 +7,25 @@ operating modes, LCD display, and comprehensive monitoring.
 """
 
 import time
+import math
 import threading
 import queue
 import json
+import logging
 import os
+import bisect
+import numpy as np
 from datetime import datetime, timedelta
 from enum import Enum
-from statistics import mean
+from collections import deque
 from gpiozero import LED, PWMLED, Button, Buzzer
-import RPi.GPIO as GPIO
+import gpiod
+
+try:
+    import pigpio
+    PIGPIO_AVAILABLE = True
+except ImportError:
+    PIGPIO_AVAILABLE = False
 
 # Add parent directory to path for shared modules
 import sys
@@ -23,18 +33,25 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '../../_shared'))
 from lcd1602 import LCD1602
 from adc0834 import ADC0834
 
+# Worker threads report through logging so silenced messages are never formatted
+log = logging.getLogger("smartfan")
+
 # Hardware Pin Definitions
+GPIO_CHIP = "gpiochip4"  # Pi 5's main GPIO chip
+
 # Temperature Sensor (NTC Thermistor via ADC)
 ADC_CS_PIN = 5
 ADC_CLK_PIN = 6
 ADC_DI_PIN = 16
 ADC_DO_PIN = 12
 TEMP_CHANNEL = 0        # ADC channel for temperature
+ADC_MAX = 255           # Full-scale reading of the 8-bit ADC0834
 
 # Fan Control
 FAN_PWM_PIN = 18        # PWM control for fan speed
 FAN_TACH_PIN = 17       # Tachometer input (fan RPM)
 FAN_ENABLE_PIN = 27     # Fan enable/disable
+FAN_PWM_FREQUENCY = 25000   # Standard 4-pin fan PWM frequency (hardware PWM)
 
 # Status LEDs
 LED_COOL_PIN = 22       # Blue - Cool temperature
@@ -42,6 +59,10 @@ LED_NORMAL_PIN = 23     # Green - Normal temperature
 LED_WARM_PIN = 24       # Yellow - Warm temperature
 LED_HOT_PIN = 25        # Red - Hot temperature
 
+# Cool/normal/warm LEDs share one gpiod line request, written with one set_values()
+TEMP_LED_PINS = [LED_COOL_PIN, LED_NORMAL_PIN, LED_WARM_PIN]
+TEMP_LEDS_OFF = [0, 0, 0]
+
 # Control Buttons
 MODE_BUTTON_PIN = 19
 UP_BUTTON_PIN = 20
@@ -53,9 +74,22 @@ BUZZER_PIN = 13
 
 # LCD Display
 LCD_I2C_ADDRESS = 0x27
+DISPLAY_ROTATE_SECONDS = 3
+
+# Fixed-width LCD row templates (16 columns, so rows overwrite cleanly)
+LCD_TEMP_ROW = "Temp: {:>4.4}°→{:.0f}°C"
+LCD_FAN_ROW = "Fan:{:3.0f}% {:>4}rpm"
+LCD_FAN_IDLE_ROW = "Fan:{:3.0f}%"
+LCD_FAN_OFF_ROW = "Fan: OFF"
+LCD_MODE_ROW = "Mode: {}"
+LCD_POWER_ROW = "Pwr:{:<3} Run:{:>3.0f}m"
+LCD_RANGE_ROW = "Lo:{:4.1f} Hi:{:4.1f}°"
+LCD_AVG_ROW = "Avg:{:4.1f}°C   {:3}"
 
 # Setpoint Potentiometer (via ADC)
 SETPOINT_CHANNEL = 1    # ADC channel for setpoint
+ADC_SCAN_INTERVAL = 0.1 # Setpoint scan period in seconds (10Hz)
+TEMP_SCAN_DIVIDER = 10  # Read temperature every Nth scan (1Hz)
 
 # Temperature Thresholds (Celsius)
 TEMP_COOL = 20          # Below this is cool
@@ -70,6 +104,16 @@ FAN_MEDIUM = 60
 FAN_HIGH = 80
 FAN_MAX = 100
 
+# Stepped fan curves: (degrees above target where each step starts, speeds)
+ECO_CURVE = (np.array([2, 5, 8]),
+             np.array([FAN_OFF, FAN_LOW, FAN_MEDIUM, FAN_HIGH], dtype=float))
+TURBO_CURVE = (np.array([-2, 0, 3]),
+               np.array([FAN_OFF, FAN_MEDIUM, FAN_HIGH, FAN_MAX], dtype=float))
+SILENT_CURVE = (np.array([3, 6]),
+                np.array([FAN_OFF, FAN_LOW, FAN_MEDIUM], dtype=float))
+
+RPM_DISPLAY_DELTA = 30  # Minimum RPM change worth a display update
+
 # Thermistor Constants (for 10K NTC thermistor)
 THERMISTOR_NOMINAL = 10000    # Resistance at 25°C
 TEMP_NOMINAL = 25             # Temperature for nominal resistance
@@ -91,6 +135,12 @@ class TemperatureControlledFan:
     def __init__(self):
         print("🌡️  Initializing Temperature-Controlled Fan System...")
         
+        # RPM measurement (before the tach callback can fire)
+        self.rpm_pulses = 0
+        self._rpm_lock = threading.Lock()
+        self._last_rpm_queued = 0
+        self.last_rpm_time = time.time()
+        
         # Initialize hardware
         self._init_sensors()
         self._init_fan_control()
@@ -111,9 +161,18 @@ class TemperatureControlledFan:
         self.min_fan_speed = 20  # Minimum PWM for fan to start
         self.max_temp_limit = 40  # Safety limit
         
+        # Auto curve breakpoints relative to the target, interpolated linearly
+        # up to FAN_HIGH; from the last breakpoint on the fan steps to FAN_MAX
+        self._auto_curve_offsets = np.array([-self.hysteresis, 0, 5, 10], dtype=float)
+        self._auto_curve_speeds = np.array([FAN_OFF, FAN_LOW, FAN_MEDIUM, FAN_HIGH],
+                                           dtype=float)
+        
         # Temperature history
-        self.temp_history = []
         self.history_size = 60  # Keep 1 minute of data
+        # Parallel deques of epoch seconds and readings (no per-sample objects)
+        self._temp_times = deque(maxlen=self.history_size)
+        self._temp_values = deque(maxlen=self.history_size)
+        self._temp_sum = 0.0  # Running sum of _temp_values
         
         # Fan curves for different modes
         self.fan_curves = {
@@ -138,16 +197,15 @@ class TemperatureControlledFan:
         }
         
         # Threading
-        self.monitoring_active = False
+        self._stop = threading.Event()
         self.sensor_queue = queue.Queue()
         self.display_queue = queue.Queue()
-        
-        # RPM measurement
-        self.rpm_pulses = 0
-        self.last_rpm_time = time.time()
+        self._config_dirty = threading.Event()
+        self._adc_lock = threading.Lock()
         
         # Load configuration
         self._load_configuration()
+        self._index_schedule()
         
         print("✅ Smart fan system initialized")
     
@@ -155,27 +213,43 @@ class TemperatureControlledFan:
         """Initialize temperature sensor (ADC)"""
         self.adc = ADC0834(cs=ADC_CS_PIN, clk=ADC_CLK_PIN,
                           di=ADC_DI_PIN, do=ADC_DO_PIN)
+        
+        # The ADC is 8-bit, so every possible reading can be converted up front
+        self._adc_temp_lut = tuple(self._compute_temp(i) for i in range(ADC_MAX + 1))
+        self._setpoint_lut = tuple(15 + (i / ADC_MAX) * 20 for i in range(ADC_MAX + 1))
         print("✓ Temperature sensor initialized")
     
     def _init_fan_control(self):
         """Initialize fan control hardware"""
-        # PWM fan control
-        self.fan_pwm = PWMLED(FAN_PWM_PIN)
+        # PWM fan control: hardware PWM through pigpio when its daemon is
+        # running, otherwise gpiozero software PWM
+        self._pi = None
+        self.fan_pwm = None
+        if PIGPIO_AVAILABLE:
+            pi = pigpio.pi()
+            if pi.connected:
+                pi.set_mode(FAN_PWM_PIN, pigpio.OUTPUT)
+                self._pi = pi
+                print("✓ Using pigpio hardware PWM for fan")
+            else:
+                pi.stop()
+        if self._pi is None:
+            self.fan_pwm = PWMLED(FAN_PWM_PIN)
         self.fan_enable = LED(FAN_ENABLE_PIN)
         
-        # Tachometer setup for RPM measurement
-        GPIO.setmode(GPIO.BCM)
-        GPIO.setup(FAN_TACH_PIN, GPIO.IN, pull_up_down=GPIO.PUD_UP)
-        GPIO.add_event_detect(FAN_TACH_PIN, GPIO.FALLING, 
-                            callback=self._rpm_pulse_callback)
+        # Tachometer setup for RPM measurement (open-collector, pulls low)
+        self.fan_tach = Button(FAN_TACH_PIN, pull_up=True)
+        self.fan_tach.when_activated = self._rpm_pulse_callback
         
         print("✓ Fan control initialized")
     
     def _init_indicators(self):
         """Initialize LED indicators"""
-        self.led_cool = LED(LED_COOL_PIN)
-        self.led_normal = LED(LED_NORMAL_PIN)
-        self.led_warm = LED(LED_WARM_PIN)
+        self._gpio_chip = gpiod.Chip(GPIO_CHIP)
+        self.temp_leds = self._gpio_chip.get_lines(TEMP_LED_PINS)
+        self.temp_leds.request(consumer="smart-fan",
+                               type=gpiod.LINE_REQ_DIR_OUT,
+                               default_vals=TEMP_LEDS_OFF)
         self.led_hot = PWMLED(LED_HOT_PIN)
         
         self.buzzer = Buzzer(BUZZER_PIN)
@@ -201,6 +275,8 @@ class TemperatureControlledFan:
     
     def _init_display(self):
         """Initialize LCD display"""
+        # Last text written to each row; None forces a rewrite
+        self._last_lcd = [None, None]
         try:
             self.lcd = LCD1602(LCD_I2C_ADDRESS)
             self.lcd.clear()
@@ -238,7 +314,17 @@ class TemperatureControlledFan:
             with open(config_file, 'w') as f:
                 json.dump(config, f, indent=2)
         except Exception as e:
-            print(f"⚠ Could not save configuration: {e}")
+            log.warning("Could not save configuration: %s", e)
+    
+    def _config_writer_loop(self):
+        """Save configuration in the background after button changes"""
+        while not self._stop.is_set():
+            if self._config_dirty.wait(timeout=0.5):
+                # Let a burst of button presses settle into one write
+                # (shutdown cuts the wait short but still saves)
+                self._stop.wait(1.0)
+                self._config_dirty.clear()
+                self._save_configuration()
     
     def _default_schedule(self):
         """Default temperature schedule"""
@@ -250,6 +336,16 @@ class TemperatureControlledFan:
             "22:00": 22   # Night
         }
     
+    def _index_schedule(self):
+        """Sort the schedule once by minute of day so lookups can bisect it"""
+        entries = []
+        for time_str, target in self.schedule.items():
+            hours, minutes = time_str.split(':')
+            entries.append((int(hours) * 60 + int(minutes), target))
+        entries.sort()
+        self._schedule_minutes = [minute for minute, _ in entries]
+        self._schedule_targets = [target for _, target in entries]
+    
     def run(self):
         """Main system loop"""
         print("\n🌡️  Smart Fan System Active!")
@@ -258,85 +354,88 @@ class TemperatureControlledFan:
         print("POWER: Toggle fan on/off")
         print("Press Ctrl+C to exit\n")
         
-        self.monitoring_active = True
-        
         # Start monitoring threads
         sensor_thread = threading.Thread(target=self._sensor_monitoring_loop, daemon=True)
         fan_thread = threading.Thread(target=self._fan_control_loop, daemon=True)
         display_thread = threading.Thread(target=self._display_update_loop, daemon=True)
         rpm_thread = threading.Thread(target=self._rpm_monitoring_loop, daemon=True)
+        processing_thread = threading.Thread(target=self._sensor_processing_loop, daemon=True)
+        config_thread = threading.Thread(target=self._config_writer_loop, daemon=True)
         
         sensor_thread.start()
         fan_thread.start()
         display_thread.start()
         rpm_thread.start()
+        processing_thread.start()
+        config_thread.start()
         
         try:
-            while True:
-                # Update target from potentiometer if in manual mode
-                if self.mode == FanMode.MANUAL:
-                    self._update_manual_target()
-                
-                # Process sensor data
-                self._process_sensor_data()
-                
-                time.sleep(0.1)
-                
+            # Worker threads do all the work; block until shutdown
+            self._stop.wait()
+            
         except KeyboardInterrupt:
             print("\n\n⏹ Shutting down smart fan system...")
-            self.monitoring_active = False
+            self._stop.set()
             self._set_fan_speed(0)
-            time.sleep(0.5)
     
     def _sensor_monitoring_loop(self):
-        """Continuous temperature monitoring"""
-        while self.monitoring_active:
+        """Scan both ADC channels: setpoint at 10Hz (manual mode), temperature at 1Hz"""
+        scan = 0
+        while not self._stop.is_set():
             try:
-                # Read temperature from ADC
-                adc_value = self.adc.read(TEMP_CHANNEL)
+                if scan % TEMP_SCAN_DIVIDER == 0:
+                    self._read_temperature()
                 
-                # Convert ADC value to temperature
-                temperature = self._adc_to_temperature(adc_value)
-                
-                # Validate reading
-                if -10 <= temperature <= 50:  # Reasonable range
-                    self.current_temp = temperature
-                    
-                    # Add to history
-                    self.temp_history.append({
-                        'time': datetime.now(),
-                        'temp': temperature
-                    })
-                    
-                    # Maintain history size
-                    if len(self.temp_history) > self.history_size:
-                        self.temp_history.pop(0)
-                    
-                    # Update statistics
-                    self._update_statistics(temperature)
-                    
-                    # Queue temperature update
-                    self.sensor_queue.put({
-                        'type': 'temperature',
-                        'value': temperature
-                    })
-                
-                time.sleep(1)  # Read every second
+                # Update target from potentiometer if in manual mode
+                if self.mode == FanMode.MANUAL:
+                    self._update_manual_target()
                 
             except Exception as e:
-                print(f"⚠ Sensor error: {e}")
-                time.sleep(1)
+                log.warning("Sensor error: %s", e)
+            
+            scan += 1
+            self._stop.wait(ADC_SCAN_INTERVAL)
+    
+    def _read_temperature(self):
+        """Read the thermistor channel and record a valid temperature"""
+        with self._adc_lock:
+            adc_value = self.adc.read(TEMP_CHANNEL)
+        
+        # Convert ADC value to temperature
+        temperature = self._adc_to_temperature(adc_value)
+        
+        # Validate reading
+        if -10 <= temperature <= 50:  # Reasonable range
+            self.current_temp = temperature
+            
+            # Add to history, keeping the running sum in step
+            if len(self._temp_values) == self.history_size:
+                self._temp_sum -= self._temp_values[0]
+            self._temp_sum += temperature
+            self._temp_times.append(time.time())
+            self._temp_values.append(temperature)
+            
+            # Update statistics
+            self._update_statistics(temperature)
+            
+            # Queue temperature update (the queue only carries temperatures)
+            self.sensor_queue.put(temperature)
     
     def _adc_to_temperature(self, adc_value):
+        """Convert ADC reading to temperature via the precomputed table"""
+        return self._adc_temp_lut[adc_value if adc_value else 1]
+    
+    def _compute_temp(self, adc_value):
         """Convert ADC reading to temperature using Steinhart-Hart equation"""
         # Convert ADC to resistance
         if adc_value == 0:
             adc_value = 1  # Prevent division by zero
+        if adc_value >= ADC_MAX:
+            return float('-inf')  # Open circuit; rejected by range check
         
-        resistance = SERIES_RESISTOR / (255.0 / adc_value - 1.0)
+        resistance = SERIES_RESISTOR / (ADC_MAX / adc_value - 1.0)
         
         # Steinhart-Hart equation
-        import math
         steinhart = resistance / THERMISTOR_NOMINAL
         steinhart = math.log(steinhart)
         steinhart /= B_COEFFICIENT
@@ -348,7 +447,7 @@ class TemperatureControlledFan:
     
     def _fan_control_loop(self):
         """Fan speed control loop"""
-        while self.monitoring_active:
+        while not self._stop.is_set():
             try:
                 if self.fan_enabled and self.current_temp is not None:
                     # Get target speed based on mode
@@ -356,73 +455,46 @@ class TemperatureControlledFan:
                         target_speed = self._manual_speed_control()
                     elif self.mode == FanMode.SCHEDULE:
                         self._update_scheduled_target()
-                        target_speed = self._auto_fan_curve(self.current_temp)
+                        target_speed = round(self._auto_fan_curve(self.current_temp))
                     else:
                         # Use mode-specific fan curve
                         fan_curve = self.fan_curves.get(self.mode, self._auto_fan_curve)
-                        target_speed = fan_curve(self.current_temp)
+                        target_speed = round(fan_curve(self.current_temp))
                     
                     # Apply speed with smoothing
                     self._set_fan_speed(target_speed)
                 else:
                     self._set_fan_speed(0)
                 
-                time.sleep(0.5)
+                self._stop.wait(0.5)
                 
             except Exception as e:
-                print(f"⚠ Fan control error: {e}")
-                time.sleep(1)
+                log.warning("Fan control error: %s", e)
+                self._stop.wait(1)
     
     def _auto_fan_curve(self, temp):
-        """Automatic fan curve based on temperature"""
-        if temp < self.target_temp - self.hysteresis:
-            return FAN_OFF
-        elif temp < self.target_temp:
-            # Proportional control near target
-            ratio = (temp - (self.target_temp - self.hysteresis)) / self.hysteresis
-            return FAN_LOW * ratio
-        elif temp < self.target_temp + 5:
-            # Linear increase above target
-            ratio = (temp - self.target_temp) / 5
-            return FAN_LOW + (FAN_MEDIUM - FAN_LOW) * ratio
-        elif temp < self.target_temp + 10:
-            # Faster increase when hot
-            ratio = (temp - self.target_temp - 5) / 5
-            return FAN_MEDIUM + (FAN_HIGH - FAN_MEDIUM) * ratio
-        else:
-            # Maximum cooling when very hot
-            return FAN_MAX
+        """Automatic fan curve based on temperature (scalar or array)"""
+        offset = np.subtract(temp, self.target_temp)
+        speed = np.interp(offset, self._auto_curve_offsets, self._auto_curve_speeds)
+        return np.where(offset >= self._auto_curve_offsets[-1], FAN_MAX, speed)[()]
+    
+    def _step_fan_curve(self, curve, temp):
+        """Look up a stepped fan curve (scalar or array)"""
+        thresholds, speeds = curve
+        return speeds[np.searchsorted(thresholds, np.subtract(temp, self.target_temp),
+                                      side='right')]
     
     def _eco_fan_curve(self, temp):
-        """Energy-saving fan curve"""
-        if temp < self.target_temp + 2:
-            return FAN_OFF
-        elif temp < self.target_temp + 5:
-            return FAN_LOW
-        elif temp < self.target_temp + 8:
-            return FAN_MEDIUM
-        else:
-            return FAN_HIGH  # Never goes to maximum
+        """Energy-saving fan curve (never goes to maximum)"""
+        return self._step_fan_curve(ECO_CURVE, temp)
     
     def _turbo_fan_curve(self, temp):
         """Aggressive cooling curve"""
-        if temp < self.target_temp - 2:
-            return FAN_OFF
-        elif temp < self.target_temp:
-            return FAN_MEDIUM
-        elif temp < self.target_temp + 3:
-            return FAN_HIGH
-        else:
-            return FAN_MAX
+        return self._step_fan_curve(TURBO_CURVE, temp)
     
     def _silent_fan_curve(self, temp):
-        """Quiet operation curve"""
-        if temp < self.target_temp + 3:
-            return FAN_OFF
-        elif temp < self.target_temp + 6:
-            return FAN_LOW
-        else:
-            return FAN_MEDIUM  # Never exceeds medium speed
+        """Quiet operation curve (never exceeds medium speed)"""
+        return self._step_fan_curve(SILENT_CURVE, temp)
     
     def _manual_speed_control(self):
         """Manual speed based on temperature difference"""
@@ -451,73 +523,90 @@ class TemperatureControlledFan:
         else:
             new_speed = speed
         
+        changed = new_speed != self.fan_speed
         self.fan_speed = new_speed
         
         # Set PWM duty cycle
         if self.fan_speed > 0:
             self.fan_enable.on()
-            self.fan_pwm.value = self.fan_speed / 100.0
+            self._write_fan_pwm(self.fan_speed)
         else:
-            self.fan_pwm.value = 0
+            self._write_fan_pwm(0)
             self.fan_enable.off()
         
-        # Update display
-        self.display_queue.put({
-            'type': 'fan_speed',
-            'value': self.fan_speed
-        })
+        # Update display only when the speed actually moved
+        if changed:
+            self.display_queue.put({
+                'type': 'fan_speed',
+                'value': self.fan_speed
+            })
+    
+    def _write_fan_pwm(self, speed):
+        """Apply a 0-100% duty cycle to the fan PWM pin"""
+        if self._pi:
+            # pigpio duty cycle is 0-1,000,000
+            self._pi.hardware_PWM(FAN_PWM_PIN, FAN_PWM_FREQUENCY, int(speed * 10000))
+        else:
+            self.fan_pwm.value = speed / 100.0
     
-    def _rpm_pulse_callback(self, channel):
+    def _rpm_pulse_callback(self):
         """Callback for fan tachometer pulses"""
-        self.rpm_pulses += 1
+        with self._rpm_lock:
+            self.rpm_pulses += 1
     
     def _rpm_monitoring_loop(self):
         """Calculate fan RPM from tachometer pulses"""
-        while self.monitoring_active:
-            # Count pulses over 1 second
+        with self._rpm_lock:
             self.rpm_pulses = 0
-            time.sleep(1)
+        last = time.monotonic()
+        
+        while not self._stop.is_set():
+            # Count pulses over roughly 1 second
+            if self._stop.wait(1):
+                break
+            with self._rpm_lock:
+                pulses, self.rpm_pulses = self.rpm_pulses, 0
+            now = time.monotonic()
+            dt, last = now - last, now
             
-            # Calculate RPM (2 pulses per revolution for typical fans)
-            self.fan_rpm = (self.rpm_pulses * 60) // 2
+            # Calculate RPM over the measured interval
+            # (2 pulses per revolution for typical fans)
+            self.fan_rpm = int(pulses * 30.0 / dt)
             
-            # Update display
-            self.display_queue.put({
-                'type': 'rpm',
-                'value': self.fan_rpm
-            })
+            # Update display when RPM moves by more than tach jitter
+            if abs(self.fan_rpm - self._last_rpm_queued) > RPM_DISPLAY_DELTA:
+                self._last_rpm_queued = self.fan_rpm
+                self.display_queue.put({
+                    'type': 'rpm',
+                    'value': self.fan_rpm
+                })
     
     def _display_update_loop(self):
         """LCD display update thread"""
+        screens = (self._show_main_display, self._show_status_display,
+                   self._show_statistics_display)
         display_mode = 0
-        last_rotation = time.time()
+        next_rotation = time.monotonic() + DISPLAY_ROTATE_SECONDS
         
-        while self.monitoring_active:
+        while not self._stop.is_set():
             try:
-                # Process display queue
+                # Wait for display updates; this also paces the loop
                 try:
-                    while not self.display_queue.empty():
-                        update = self.display_queue.get_nowait()
+                    update = self.display_queue.get(timeout=0.1)
+                    while True:
                         # Updates are processed in main display
+                        update = self.display_queue.get_nowait()
                 except queue.Empty:
                     pass
                 
-                # Rotate display every 3 seconds
-                if time.time() - last_rotation > 3:
-                    if display_mode == 0:
-                        self._show_main_display()
-                    elif display_mode == 1:
-                        self._show_status_display()
-                    elif display_mode == 2:
-                        self._show_statistics_display()
-                    
-                    display_mode = (display_mode + 1) % 3
-                    last_rotation = time.time()
-                
-                time.sleep(0.1)
+                # Rotate display every few seconds
+                if time.monotonic() >= next_rotation:
+                    screens[display_mode]()
+                    display_mode = (display_mode + 1) % len(screens)
+                    next_rotation = time.monotonic() + DISPLAY_ROTATE_SECONDS
                 
             except Exception as e:
-                print(f"⚠ Display error: {e}")
+                log.warning("Display error: %s", e)
     
     def _show_main_display(self):
         """Show main temperature and fan info"""
@@ -525,26 +614,22 @@ class TemperatureControlledFan:
             return
         
         try:
-            # Temperature display
-            temp_str = f"{self.current_temp:.1f}°C" if self.current_temp else "--.-°C"
-            target_str = f"{self.target_temp:.0f}°C"
-            
-            self.lcd.clear()
-            self.lcd.write(0, 0, f"Temp: {temp_str}")
-            self.lcd.write(0, 11, f"→{target_str}")
+            # Temperature display (target sits at column 11)
+            temp_str = f"{self.current_temp:.1f}" if self.current_temp else "--.-"
+            line0 = LCD_TEMP_ROW.format(temp_str, self.target_temp)
             
             # Fan status
-            if self.fan_enabled:
-                fan_str = f"Fan: {self.fan_speed:3.0f}%"
-                if self.fan_rpm > 0:
-                    fan_str += f" {self.fan_rpm}rpm"
+            if not self.fan_enabled:
+                line1 = LCD_FAN_OFF_ROW
+            elif self.fan_rpm > 0:
+                line1 = LCD_FAN_ROW.format(self.fan_speed, self.fan_rpm)
             else:
-                fan_str = "Fan: OFF"
+                line1 = LCD_FAN_IDLE_ROW.format(self.fan_speed)
             
-            self.lcd.write(1, 0, fan_str[:16])
+            self._write_lcd_lines(line0, line1)
             
         except Exception as e:
-            print(f"⚠ Main display error: {e}")
+            log.warning("Main display error: %s", e)
     
     def _show_status_display(self):
         """Show system status"""
@@ -552,13 +637,11 @@ class TemperatureControlledFan:
             return
         
         try:
-            self.lcd.clear()
-            self.lcd.write(0, 0, f"Mode: {self.mode.value}")
-            
             # Power status and time
             status = "ON" if self.fan_enabled else "OFF"
             runtime = (datetime.now() - self.session_start).total_seconds() / 60
-            self.lcd.write(1, 0, f"Pwr:{status} Run:{runtime:.0f}m")
+            self._write_lcd_lines(LCD_MODE_ROW.format(self.mode.value),
+                                  LCD_POWER_ROW.format(status, runtime))
             
         except:
             pass
@@ -569,35 +652,44 @@ class TemperatureControlledFan:
             return
         
         try:
-            self.lcd.clear()
-            self.lcd.write(0, 0, f"Min:{self.temp_stats['min']:.1f} Max:{self.temp_stats['max']:.1f}")
-            self.lcd.write(1, 0, f"Avg:{self.temp_stats['avg']:.1f}°C")
-            
             # Energy saving indicator
-            if self.mode == FanMode.ECO:
-                self.lcd.write(1, 12, "ECO")
+            eco = "ECO" if self.mode == FanMode.ECO else ""
+            
+            self._write_lcd_lines(
+                LCD_RANGE_ROW.format(self.temp_stats['min'], self.temp_stats['max']),
+                LCD_AVG_ROW.format(self.temp_stats['avg'], eco))
                 
         except:
             pass
     
+    def _write_lcd_lines(self, line0, line1):
+        """Write both LCD rows, skipping rows whose text hasn't changed"""
+        # Pad to full width so a shorter line overwrites the previous one
+        for row, text in enumerate((f"{line0:<16.16}", f"{line1:<16.16}")):
+            if text != self._last_lcd[row]:
+                self.lcd.write(row, 0, text)
+                self._last_lcd[row] = text
+    
+    def _sensor_processing_loop(self):
+        """Handle sensor data as soon as it is queued"""
+        while not self._stop.is_set():
+            self._process_sensor_data()
+    
     def _process_sensor_data(self):
         """Process queued sensor data"""
         try:
-            while not self.sensor_queue.empty():
-                data = self.sensor_queue.get_nowait()
-                
-                if data['type'] == 'temperature':
-                    self._update_temperature_display(data['value'])
-                    self._update_led_indicators(data['value'])
-                    
+            temperature = self.sensor_queue.get(timeout=0.1)
         except queue.Empty:
-            pass
+            return
+        
+        self._update_temperature_display(temperature)
+        self._update_led_indicators(temperature)
     
     def _update_temperature_display(self, temp):
         """Update temperature-related displays"""
         # Check for extreme temperatures
         if temp > self.max_temp_limit:
-            print(f"⚠️  WARNING: High temperature: {temp:.1f}°C")
+            log.warning("WARNING: High temperature: %.1f°C", temp)
             if hasattr(self, 'last_alert_time'):
                 if time.time() - self.last_alert_time > 30:  # Alert every 30s
                     self.buzzer.beep(0.5, 0.5, n=3)
@@ -608,25 +700,26 @@ class TemperatureControlledFan:
     
     def _update_led_indicators(self, temp):
         """Update LED indicators based on temperature"""
-        # Turn off all LEDs first
-        self._all_leds_off()
-        
-        # Light appropriate LED
+        # Pick the cool/normal/warm pattern and write it in one call
         if temp < TEMP_COOL:
-            self.led_cool.on()
+            pattern = [1, 0, 0]
         elif temp < TEMP_NORMAL:
-            self.led_normal.on()
+            pattern = [0, 1, 0]
         elif temp < TEMP_WARM:
-            self.led_warm.on()
+            pattern = [0, 0, 1]
         else:
+            pattern = TEMP_LEDS_OFF
+        self.temp_leds.set_values(pattern)
+        
+        if pattern is TEMP_LEDS_OFF:
             # Hot - pulse red LED
             self.led_hot.pulse(fade_in_time=0.5, fade_out_time=0.5)
+        else:
+            self.led_hot.off()
     
     def _all_leds_off(self):
         """Turn off all LED indicators"""
-        self.led_cool.off()
-        self.led_normal.off()
-        self.led_warm.off()
+        self.temp_leds.set_values(TEMP_LEDS_OFF)
         self.led_hot.off()
     
     def _cycle_mode(self):
@@ -638,8 +731,8 @@ class TemperatureControlledFan:
         
         print(f"🔄 Mode: {self.mode.value}")
         
-        # Save configuration
-        self._save_configuration()
+        # Save configuration (in the background)
+        self._config_dirty.set()
         
         # Update display immediately
         self._show_status_display()
@@ -652,7 +745,7 @@ class TemperatureControlledFan:
         if self.target_temp < 35:
             self.target_temp += 1
             print(f"📈 Target temperature: {self.target_temp}°C")
-            self._save_configuration()
+            self._config_dirty.set()
             self.buzzer.beep(0.05, 0, n=1)
     
     def _decrease_target(self):
@@ -660,7 +753,7 @@ class TemperatureControlledFan:
         if self.target_temp > 15:
             self.target_temp -= 1
             print(f"📉 Target temperature: {self.target_temp}°C")
-            self._save_configuration()
+            self._config_dirty.set()
             self.buzzer.beep(0.05, 0, n=1)
     
     def _toggle_power(self):
@@ -679,10 +772,11 @@ class TemperatureControlledFan:
         """Update target temperature from potentiometer"""
         try:
             # Read setpoint potentiometer
-            adc_value = self.adc.read(SETPOINT_CHANNEL)
+            with self._adc_lock:
+                adc_value = self.adc.read(SETPOINT_CHANNEL)
             
             # Map to temperature range (15-35°C)
-            self.target_temp = 15 + (adc_value / 255) * 20
+            self.target_temp = self._setpoint_lut[adc_value]
             
         except:
             pass
@@ -692,16 +786,13 @@ class TemperatureControlledFan:
         if not self.schedule_enabled:
             return
         
-        current_time = datetime.now().strftime("%H:%M")
+        now = datetime.now()
+        minute_of_day = now.hour * 60 + now.minute
         
-        # Find applicable schedule entry
-        scheduled_temp = None
-        for time_str, temp in sorted(self.schedule.items()):
-            if current_time >= time_str:
-                scheduled_temp = temp
-        
-        if scheduled_temp is not None:
-            self.target_temp = scheduled_temp
+        # Find the latest schedule entry at or before now
+        idx = bisect.bisect_right(self._schedule_minutes, minute_of_day) - 1
+        if idx >= 0:
+            self.target_temp = self._schedule_targets[idx]
     
     def _update_statistics(self, temp):
         """Update temperature statistics"""
@@ -711,9 +802,8 @@ class TemperatureControlledFan:
             self.temp_stats['max'] = temp
         
         # Calculate running average
-        if self.temp_history:
-            temps = [entry['temp'] for entry in self.temp_history]
-            self.temp_stats['avg'] = mean(temps)
+        if self._temp_values:
+            self.temp_stats['avg'] = self._temp_sum / len(self._temp_values)
     
     def get_statistics(self):
         """Get system statistics"""
@@ -742,7 +832,7 @@ class TemperatureControlledFan:
         print("\n🧹 Cleaning up...")
         
         # Stop monitoring
-        self.monitoring_active = False
+        self._stop.set()
         
         # Turn off fan
         self._set_fan_speed(0)
@@ -768,15 +858,16 @@ class TemperatureControlledFan:
         # Save final configuration
         self._save_configuration()
         
-        # Clean up GPIO
-        GPIO.cleanup()
-        
         # Close hardware
-        self.fan_pwm.close()
+        if self._pi:
+            self._pi.hardware_PWM(FAN_PWM_PIN, 0, 0)
+            self._pi.stop()
+        else:
+            self.fan_pwm.close()
         self.fan_enable.close()
-        self.led_cool.close()
-        self.led_normal.close()
-        self.led_warm.close()
+        self.fan_tach.close()
+        self.temp_leds.release()
+        self._gpio_chip.close()
         self.led_hot.close()
         self.buzzer.close()
         self.mode_button.close()
@@ -784,6 +875,8 @@ class TemperatureControlledFan:
         self.down_button.close()
         self.power_button.close()
         
+        logging.shutdown()
+        
         print("\n✅ Cleanup complete")
 
 
@@ -817,9 +910,9 @@ def temperature_demo():
             
             # Calculate fan speed
             if fan.mode in fan.fan_curves:
-                speed = fan.fan_curves[fan.mode](temp)
+                speed = round(fan.fan_curves[fan.mode](temp))
             else:
-                speed = fan._auto_fan_curve(temp)
+                speed = round(fan._auto_fan_curve(temp))
             
             fan._set_fan_speed(speed)
             
@@ -854,11 +947,11 @@ def mode_test():
             print(f"{mode.value} mode:")
             
             if mode in fan.fan_curves:
-                speed = fan.fan_curves[mode](test_temp)
+                speed = round(fan.fan_curves[mode](test_temp))
             elif mode == FanMode.MANUAL:
                 speed = fan._manual_speed_control()
             else:
-                speed = fan._auto_fan_curve(test_temp)
+                speed = round(fan._auto_fan_curve(test_temp))
             
             print(f"  Fan speed: {speed}%")
             
@@ -869,6 +962,8 @@ def mode_test():
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING, format="⚠ %(message)s")
+    
     # Check for demo mode
     if len(sys.argv) > 1 and sys.argv[1] == "demo":
         temperature_demo()
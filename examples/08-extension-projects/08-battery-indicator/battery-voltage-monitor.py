@@ -9,14 +9,23 @@ Supports various battery types and chemistries.
 
 import time
 import threading
-import queue
 import json
 import os
-from datetime import datetime, timedelta
+from datetime import datetime
 from enum import Enum
-from statistics import mean, stdev
+from collections import deque
 from gpiozero import LED, PWMLED, Buzzer, Button
-import numpy as np
+import numpy as np  # Required: history ring buffer, trend/discharge kernels, batch stats
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    
+    def njit(*args, **kwargs):
+        """Without Numba the kernels below run as plain Python"""
+        return lambda func: func
 
 # Add parent directory to path for shared modules
 import sys
@@ -48,6 +57,20 @@ BUZZER_PIN = 14
 # LCD Display
 LCD_I2C_ADDRESS = 0x27
 
+# LCD row templates, formatted with values unpacked into locals
+LCD_VOLTAGE_ROW = "{:.2f}V  {:3.0f}%"
+LCD_CELL_ROW = "{} {:.2f}V/cell"
+LCD_PERCENT_ROW = "Battery: {:3.0f}%"
+LCD_TIME_ROW = "{}h {}m"
+LCD_RANGE_ROW = "Min:{:.1f} Max:{:.1f}"
+LCD_RUNTIME_ROW = "Runtime: {:.0f}min"
+LCD_BARS = tuple('█' * n + '░' * (16 - n) for n in range(17))  # Indexed by filled cells
+
+# Data Log (one JSON object per line, appended through a handle kept open)
+LOG_FILE = "battery_log.json"
+LOG_RECORD = ('{{"timestamp": "{}", "voltage": {:.3f}, "percentage": {:.1f}, '
+              '"discharge_rate": {:.3f}, "battery_type": "{}"}}\n')
+
 # Voltage Divider Constants
 # For measuring higher voltages (e.g., 12V battery)
 # Vout = Vin * R2 / (R1 + R2)
@@ -55,6 +78,7 @@ R1 = 10000  # 10kΩ
 R2 = 3300   # 3.3kΩ
 VOLTAGE_DIVIDER_RATIO = (R1 + R2) / R2
 ADC_REFERENCE_VOLTAGE = 3.3  # ADC reference voltage
+ADC_TO_VOLTAGE = (ADC_REFERENCE_VOLTAGE / 255.0) * VOLTAGE_DIVIDER_RATIO  # Battery volts per ADC step
 
 # Battery Types and Characteristics
 BATTERY_PROFILES = {
@@ -102,6 +126,33 @@ BATTERY_PROFILES = {
     }
 }
 
+@njit(cache=True)
+def _discharge_rate(v_buf, t_buf, idx, count):
+    """Voltage drop in V/hour over the last `count` ring-buffer samples"""
+    size = v_buf.shape[0]
+    first = (idx - count) % size
+    last = (idx - 1) % size
+    time_diff = t_buf[last] - t_buf[first]
+    if time_diff <= 0:
+        return np.nan
+    return (v_buf[first] - v_buf[last]) * 3600.0 / time_diff
+
+
+@njit(cache=True)
+def _graph_levels(voltages, out):
+    """Scale voltages into 0-8 trend-graph levels, written to `out`"""
+    v_min = voltages.min()
+    v_max = voltages.max()
+    v_range = v_max - v_min if v_max > v_min else 1.0
+    # One vectorized expression; assigning into the uint8 array truncates
+    out[:] = (voltages - v_min) / v_range * 8
+
+
+# Trend graph characters indexed by level (0-8), as a translate() table
+GRAPH_CHARS = " ▁▂▃▄▅▆▇█"
+GRAPH_TABLE = str.maketrans({chr(level): char for level, char in enumerate(GRAPH_CHARS)})
+
+
 class DisplayMode(Enum):
     """Display mode enumeration"""
     VOLTAGE = "Voltage"
@@ -113,6 +164,30 @@ class DisplayMode(Enum):
 class BatteryVoltageMonitor:
     """Main battery monitoring system class"""
     
+    # Fixed attribute set: slot access is cheaper than instance-dict lookups
+    __slots__ = (
+        # Hardware
+        'adc', 'led_bar', '_bar_transitions', 'led_charging', 'led_low_battery',
+        'led_critical', 'buzzer', 'mode_button', 'calibrate_button', 'lcd',
+        '_lcd_cache',
+        # Battery state and profile cache
+        'battery_voltage', 'battery_percentage', 'battery_type', 'display_mode',
+        '_last_display_mode', 'is_charging', 'calibration_offset', '_profile',
+        '_vempty', '_vrange', '_vfull_x15', '_cells', '_btype_short',
+        # History ring buffer
+        'history_size', '_v_buf', '_t_buf', '_hist_idx', '_hist_count',
+        'discharge_rate',
+        # Alerts and indicators
+        'low_battery_threshold', 'critical_battery_threshold', 'last_alert_time',
+        'alert_interval', 'alert_check_interval', '_last_alert_check',
+        '_last_leds_to_light', '_last_alert_level',
+        # Statistics and logging
+        'session_start', 'min_voltage', 'max_voltage', 'total_samples', 'log_interval',
+        'last_log_time', '_log_fh', '_last_saved_settings',
+        # Threading
+        'monitoring_active', 'voltage_queue', 'display_queue', '_voltage_ready',
+    )
+    
     def __init__(self):
         print("🔋 Initializing Battery Voltage Monitor...")
         
@@ -127,12 +202,22 @@ class BatteryVoltageMonitor:
         self.battery_percentage = 0
         self.battery_type = "LiPo_3S"  # Default battery type
         self.display_mode = DisplayMode.VOLTAGE
+        self._last_display_mode = None
         self.is_charging = False
         self.calibration_offset = 0.0
         
-        # Voltage history for averaging and analysis
-        self.voltage_history = []
+        # Voltage history for averaging and analysis: a ring buffer of
+        # voltages and monotonic timestamps written at _hist_idx
         self.history_size = 60  # Keep 1 minute of data
+        self._v_buf = np.zeros(self.history_size, dtype=np.float32)
+        self._t_buf = np.zeros(self.history_size, dtype=np.float64)
+        self._hist_idx = 0
+        self._hist_count = 0
+        
+        if NUMBA_AVAILABLE:
+            # Compile the kernels now rather than on the first samples
+            _discharge_rate(self._v_buf, self._t_buf, 0, 2)
+            _graph_levels(np.zeros(2, dtype=np.float32), np.zeros(2, dtype=np.uint8))
         self.discharge_rate = 0.0  # V/hour
         
         # Alert thresholds
@@ -140,6 +225,8 @@ class BatteryVoltageMonitor:
         self.critical_battery_threshold = 10  # Percentage
         self.last_alert_time = 0
         self.alert_interval = 60  # Seconds between alerts
+        self.alert_check_interval = 5  # Seconds between alert checks
+        self._last_alert_check = 0
         
         # Statistics
         self.session_start = datetime.now()
@@ -150,17 +237,36 @@ class BatteryVoltageMonitor:
         # Data logging
         self.log_interval = 60  # Log every minute
         self.last_log_time = time.time()
+        try:
+            self._log_fh = open(LOG_FILE, 'a')
+        except OSError as e:
+            print(f"⚠ Could not open log file: {e}")
+            self._log_fh = None
         
         # Threading
         self.monitoring_active = False
-        self.voltage_queue = queue.Queue()
-        self.display_queue = queue.Queue()
+        # One producer and one consumer each, so deque's atomic
+        # append/popleft is enough; the display only needs the newest frame
+        self.voltage_queue = deque(maxlen=256)
+        self.display_queue = deque(maxlen=1)
+        self._voltage_ready = threading.Event()  # Set when voltage_queue has data
         
         # Load configuration
+        self._last_saved_settings = None
         self._load_configuration()
+        self._select_battery_profile()
         
         print("✅ Battery monitor initialized")
     
+    def _select_battery_profile(self):
+        """Cache the current battery profile and the values derived from it"""
+        self._profile = BATTERY_PROFILES[self.battery_type]
+        self._vempty = self._profile['empty']
+        self._vrange = self._profile['full'] - self._vempty
+        self._vfull_x15 = self._profile['full'] * 1.5  # Upper bound for valid readings
+        self._cells = self._profile['cells']
+        self._btype_short = self.battery_type[:6]  # As shown on the LCD
+    
     def _init_adc(self):
         """Initialize ADC for voltage measurement"""
         self.adc = ADC0834(cs=ADC_CS_PIN, clk=ADC_CLK_PIN,
@@ -174,6 +280,16 @@ class BatteryVoltageMonitor:
         for pin in LED_BAR_PINS:
             self.led_bar.append(LED(pin))
         
+        # Precomputed LED writes for every (old, new) lit count, so an
+        # update just calls the writes for its transition
+        count = len(self.led_bar)
+        self._bar_transitions = [
+            [tuple(self.led_bar[i].on if i < new else self.led_bar[i].off
+                   for i in range(min(old, new), max(old, new)))
+             for new in range(count + 1)]
+            for old in range(count + 1)
+        ]
+        
         # Status LEDs
         self.led_charging = LED(LED_CHARGING_PIN)
         self.led_low_battery = PWMLED(LED_LOW_BAT_PIN)
@@ -182,7 +298,8 @@ class BatteryVoltageMonitor:
         # Buzzer
         self.buzzer = Buzzer(BUZZER_PIN)
         
-        # Turn off all LEDs
+        # Turn off all LEDs (this also records the LED state for diffing,
+        # so unchanged levels cost no GPIO calls)
         self._all_leds_off()
         print("✓ Indicators initialized")
     
@@ -204,9 +321,9 @@ class BatteryVoltageMonitor:
         """Initialize LCD display"""
         try:
             self.lcd = LCD1602(LCD_I2C_ADDRESS)
-            self.lcd.clear()
-            self.lcd.write(0, 0, "Battery Monitor")
-            self.lcd.write(1, 0, "Initializing...")
+            self._lcd_clear()
+            self._lcd_write(0, "Battery Monitor")
+            self._lcd_write(1, "Initializing...")
             print("✓ LCD display initialized")
         except Exception as e:
             print(f"⚠ LCD initialization failed: {e}")
@@ -223,23 +340,32 @@ class BatteryVoltageMonitor:
                     self.calibration_offset = config.get('calibration_offset', 0.0)
                     self.low_battery_threshold = config.get('low_threshold', 20)
                     self.critical_battery_threshold = config.get('critical_threshold', 10)
+                    self._last_saved_settings = self._config_settings()
                     print(f"✓ Configuration loaded: {self.battery_type}")
         except Exception as e:
             print(f"⚠ Could not load configuration: {e}")
     
+    def _config_settings(self):
+        """Settings persisted in the configuration file"""
+        return {
+            'battery_type': self.battery_type,
+            'calibration_offset': self.calibration_offset,
+            'low_threshold': self.low_battery_threshold,
+            'critical_threshold': self.critical_battery_threshold
+        }
+    
     def _save_configuration(self):
-        """Save current configuration"""
+        """Save current configuration (skipped when nothing has changed)"""
         config_file = "battery_monitor_config.json"
+        settings = self._config_settings()
+        if settings == self._last_saved_settings:
+            return
+        
         try:
-            config = {
-                'battery_type': self.battery_type,
-                'calibration_offset': self.calibration_offset,
-                'low_threshold': self.low_battery_threshold,
-                'critical_threshold': self.critical_battery_threshold,
-                'last_saved': datetime.now().isoformat()
-            }
+            config = dict(settings, last_saved=datetime.now().isoformat())
             with open(config_file, 'w') as f:
                 json.dump(config, f, indent=2)
+            self._last_saved_settings = settings
         except Exception as e:
             print(f"⚠ Could not save configuration: {e}")
     
@@ -255,15 +381,13 @@ class BatteryVoltageMonitor:
         # Start monitoring threads
         voltage_thread = threading.Thread(target=self._voltage_monitoring_loop, daemon=True)
         display_thread = threading.Thread(target=self._display_update_loop, daemon=True)
-        alert_thread = threading.Thread(target=self._alert_monitoring_loop, daemon=True)
         
         voltage_thread.start()
         display_thread.start()
-        alert_thread.start()
         
         try:
             while True:
-                # Process voltage readings
+                # Process voltage readings (blocks until the sampler has some)
                 self._process_voltage_data()
                 
                 # Update LED bar graph
@@ -274,7 +398,11 @@ class BatteryVoltageMonitor:
                     self._log_battery_data()
                     self.last_log_time = time.time()
                 
-                time.sleep(0.1)
+                # Check for low battery alerts
+                now = time.time()
+                if now - self._last_alert_check > self.alert_check_interval:
+                    self._check_alerts()
+                    self._last_alert_check = now
                 
         except KeyboardInterrupt:
             print("\n\n⏹ Shutting down battery monitor...")
@@ -288,21 +416,14 @@ class BatteryVoltageMonitor:
                 # Read ADC value
                 adc_value = self.adc.read(BATTERY_CHANNEL)
                 
-                # Convert to voltage
-                adc_voltage = (adc_value / 255.0) * ADC_REFERENCE_VOLTAGE
-                actual_voltage = adc_voltage * VOLTAGE_DIVIDER_RATIO
-                
-                # Apply calibration offset
-                calibrated_voltage = actual_voltage + self.calibration_offset
+                # Convert to battery voltage and apply calibration offset
+                calibrated_voltage = adc_value * ADC_TO_VOLTAGE + self.calibration_offset
                 
                 # Validate reading
-                profile = BATTERY_PROFILES[self.battery_type]
-                if 0 < calibrated_voltage < profile['full'] * 1.5:
+                if 0 < calibrated_voltage < self._vfull_x15:
                     # Add to queue
-                    self.voltage_queue.put({
-                        'voltage': calibrated_voltage,
-                        'timestamp': datetime.now()
-                    })
+                    self.voltage_queue.append((calibrated_voltage, time.monotonic()))
+                    self._voltage_ready.set()
                 
                 time.sleep(0.5)  # Sample every 500ms
                 
@@ -312,36 +433,33 @@ class BatteryVoltageMonitor:
     
     def _process_voltage_data(self):
         """Process queued voltage readings"""
+        # Sleep until the sampler signals new readings instead of polling
+        if not self._voltage_ready.wait(timeout=0.5):
+            return
+        self._voltage_ready.clear()
+        
         readings = []
         
-        try:
-            # Get all available readings
-            while not self.voltage_queue.empty():
-                data = self.voltage_queue.get_nowait()
-                readings.append(data['voltage'])
-                
-                # Add to history
-                self.voltage_history.append({
-                    'voltage': data['voltage'],
-                    'timestamp': data['timestamp']
-                })
-        except queue.Empty:
-            pass
+        # Get all available readings
+        while True:
+            try:
+                voltage, timestamp = self.voltage_queue.popleft()
+            except IndexError:
+                break
+            readings.append(voltage)
+            
+            # Add to history
+            self._record_voltage(voltage, timestamp)
         
         if readings:
-            # Calculate average voltage
-            self.battery_voltage = mean(readings)
+            # Average and extremes of the batch in one array
+            batch = np.fromiter(readings, dtype=np.float64, count=len(readings))
+            self.battery_voltage = float(batch.mean())
             
             # Update statistics
             self.total_samples += len(readings)
-            if self.battery_voltage < self.min_voltage:
-                self.min_voltage = self.battery_voltage
-            if self.battery_voltage > self.max_voltage:
-                self.max_voltage = self.battery_voltage
-            
-            # Maintain history size
-            while len(self.voltage_history) > self.history_size:
-                self.voltage_history.pop(0)
+            self.min_voltage = min(self.min_voltage, float(batch.min()))
+            self.max_voltage = max(self.max_voltage, float(batch.max()))
             
             # Calculate battery percentage
             self._calculate_battery_percentage()
@@ -350,70 +468,78 @@ class BatteryVoltageMonitor:
             self._calculate_discharge_rate()
             
             # Update display
-            self.display_queue.put({
+            self.display_queue.append({
                 'voltage': self.battery_voltage,
                 'percentage': self.battery_percentage,
                 'discharge_rate': self.discharge_rate
             })
     
+    def _record_voltage(self, voltage, timestamp):
+        """Store a reading in the history ring buffer"""
+        self._v_buf[self._hist_idx] = voltage
+        self._t_buf[self._hist_idx] = timestamp
+        self._hist_idx = (self._hist_idx + 1) % self.history_size
+        self._hist_count = min(self._hist_count + 1, self.history_size)
+    
+    def _history_window(self, count):
+        """Return the last `count` voltages and timestamps, oldest first"""
+        count = min(count, self._hist_count)
+        indices = np.arange(self._hist_idx - count, self._hist_idx)
+        return (np.take(self._v_buf, indices, mode='wrap'),
+                np.take(self._t_buf, indices, mode='wrap'))
+    
     def _calculate_battery_percentage(self):
         """Calculate battery percentage based on voltage"""
-        profile = BATTERY_PROFILES[self.battery_type]
-        
         # Linear interpolation between empty and full
-        voltage_range = profile['full'] - profile['empty']
-        voltage_above_empty = self.battery_voltage - profile['empty']
-        
-        percentage = (voltage_above_empty / voltage_range) * 100
+        percentage = (self.battery_voltage - self._vempty) / self._vrange * 100
         
         # Clamp to 0-100%
         self.battery_percentage = max(0, min(100, percentage))
     
     def _calculate_discharge_rate(self):
         """Calculate discharge rate from voltage history"""
-        if len(self.voltage_history) < 10:
+        if self._hist_count < 10:
             return
         
-        # Get data from last 30 seconds
-        recent_history = self.voltage_history[-30:]
-        if len(recent_history) < 2:
-            return
-        
-        # Calculate voltage change over time
-        start_voltage = recent_history[0]['voltage']
-        end_voltage = recent_history[-1]['voltage']
-        time_diff = (recent_history[-1]['timestamp'] - 
-                    recent_history[0]['timestamp']).total_seconds()
-        
-        if time_diff > 0:
-            # V/hour
-            self.discharge_rate = (start_voltage - end_voltage) * 3600 / time_diff
+        # Voltage change over the last 30 samples (V/hour)
+        rate = _discharge_rate(self._v_buf, self._t_buf, self._hist_idx,
+                               min(30, self._hist_count))
+        if not np.isnan(rate):
+            self.discharge_rate = float(rate)
     
     def _update_led_bar(self):
         """Update LED bar graph based on battery percentage"""
         # Calculate how many LEDs to light
         leds_to_light = int((self.battery_percentage / 100) * len(self.led_bar))
         
-        # Update LEDs
-        for i, led in enumerate(self.led_bar):
-            if i < leds_to_light:
-                led.on()
-            else:
-                led.off()
-        
         # Color coding for last LED (if using RGB LEDs in real implementation)
         # Green: > 50%, Yellow: 20-50%, Red: < 20%
-        if self.battery_percentage < self.critical_battery_threshold:
-            # Critical - flash last LED
-            if leds_to_light > 0:
-                self.led_bar[leds_to_light - 1].off()
-                self.led_bar[0].on()  # Keep at least one LED for visibility
-        
-        # Update status LEDs
-        if self.battery_percentage < self.critical_battery_threshold:
+        critical = self.battery_percentage < self.critical_battery_threshold
+        if critical and leds_to_light > 0:
+            # Critical - drop the last LED but keep one lit for visibility
+            leds_to_light = max(leds_to_light - 1, 1)
+        
+        # Only touch the LEDs between the old and new level
+        if leds_to_light != self._last_leds_to_light:
+            for write in self._bar_transitions[self._last_leds_to_light][leds_to_light]:
+                write()
+            self._last_leds_to_light = leds_to_light
+        
+        # Update status LEDs (restarting a pulse every pass would reset it)
+        if critical:
+            alert_level = 'critical'
+        elif self.battery_percentage < self.low_battery_threshold:
+            alert_level = 'low'
+        else:
+            alert_level = 'ok'
+        if alert_level == self._last_alert_level:
+            return
+        self._last_alert_level = alert_level
+        
+        if alert_level == 'critical':
             self.led_critical.pulse(fade_in_time=0.2, fade_out_time=0.2)
             self.led_low_battery.off()
-        elif self.battery_percentage < self.low_battery_threshold:
+        elif alert_level == 'low':
             self.led_low_battery.pulse(fade_in_time=0.5, fade_out_time=0.5)
             self.led_critical.off()
         else:
@@ -425,14 +551,17 @@ class BatteryVoltageMonitor:
         while self.monitoring_active:
             try:
                 # Get latest data
-                display_data = None
                 try:
-                    while not self.display_queue.empty():
-                        display_data = self.display_queue.get_nowait()
-                except queue.Empty:
-                    pass
+                    display_data = self.display_queue.pop()
+                except IndexError:
+                    display_data = None
                 
-                if display_data:
+                if display_data and self.lcd:
+                    # Start a new screen from blank only when the mode changes
+                    if self.display_mode != self._last_display_mode:
+                        self._lcd_clear()
+                        self._last_display_mode = self.display_mode
+                    
                     # Update display based on mode
                     if self.display_mode == DisplayMode.VOLTAGE:
                         self._show_voltage_display(display_data)
@@ -450,23 +579,33 @@ class BatteryVoltageMonitor:
             except Exception as e:
                 print(f"⚠ Display error: {e}")
     
+    def _lcd_write(self, row, text):
+        """Write an LCD row padded to full width, skipping unchanged rows"""
+        # Padding overwrites the previous text, so rows never need clear();
+        # anything past column 16 is off-screen and not worth the I2C bytes
+        text = f"{text:<16.16}"
+        if text != self._lcd_cache[row]:
+            self.lcd.write(row, 0, text)
+            self._lcd_cache[row] = text
+    
+    def _lcd_clear(self):
+        """Clear the LCD and forget the cached rows"""
+        self.lcd.clear()
+        self._lcd_cache = ["", ""]
+    
     def _show_voltage_display(self, data):
         """Show voltage information"""
         if not self.lcd:
             return
         
         try:
-            self.lcd.clear()
+            voltage = data['voltage']
             
             # Voltage and percentage
-            self.lcd.write(0, 0, f"{data['voltage']:.2f}V  {data['percentage']:3.0f}%")
+            self._lcd_write(0, LCD_VOLTAGE_ROW.format(voltage, data['percentage']))
             
             # Battery type and status
-            profile = BATTERY_PROFILES[self.battery_type]
-            cells = profile['cells']
-            cell_voltage = data['voltage'] / cells
-            
-            self.lcd.write(1, 0, f"{self.battery_type[:6]} {cell_voltage:.2f}V/cell")
+            self._lcd_write(1, LCD_CELL_ROW.format(self._btype_short, voltage / self._cells))
             
         except Exception as e:
             print(f"⚠ Voltage display error: {e}")
@@ -477,16 +616,13 @@ class BatteryVoltageMonitor:
             return
         
         try:
-            self.lcd.clear()
+            percentage = data['percentage']
             
             # Large percentage display
-            percentage_str = f"{data['percentage']:3.0f}%"
-            self.lcd.write(0, 0, f"Battery: {percentage_str}")
+            self._lcd_write(0, LCD_PERCENT_ROW.format(percentage))
             
             # Visual bar graph on LCD
-            bar_length = int((data['percentage'] / 100) * 16)
-            bar = '█' * bar_length + '░' * (16 - bar_length)
-            self.lcd.write(1, 0, bar)
+            self._lcd_write(1, LCD_BARS[int((percentage / 100) * 16)])
             
         except:
             pass
@@ -497,26 +633,24 @@ class BatteryVoltageMonitor:
             return
         
         try:
-            self.lcd.clear()
-            
             # Calculate time remaining based on discharge rate
-            if abs(data['discharge_rate']) > 0.01:
-                profile = BATTERY_PROFILES[self.battery_type]
-                voltage_remaining = data['voltage'] - profile['empty']
-                hours_remaining = voltage_remaining / abs(data['discharge_rate'])
+            discharge_rate = abs(data['discharge_rate'])
+            if discharge_rate > 0.01:
+                voltage_remaining = data['voltage'] - self._vempty
+                hours_remaining = voltage_remaining / discharge_rate
                 
                 if hours_remaining > 0:
                     hours = int(hours_remaining)
                     minutes = int((hours_remaining - hours) * 60)
                     
-                    self.lcd.write(0, 0, f"Time Left:")
-                    self.lcd.write(1, 0, f"{hours}h {minutes}m")
+                    self._lcd_write(0, "Time Left:")
+                    self._lcd_write(1, LCD_TIME_ROW.format(hours, minutes))
                 else:
-                    self.lcd.write(0, 0, "Time Left:")
-                    self.lcd.write(1, 0, "Calculating...")
+                    self._lcd_write(0, "Time Left:")
+                    self._lcd_write(1, "Calculating...")
             else:
-                self.lcd.write(0, 0, "Discharge Rate:")
-                self.lcd.write(1, 0, "Too Low")
+                self._lcd_write(0, "Discharge Rate:")
+                self._lcd_write(1, "Too Low")
                 
         except:
             pass
@@ -527,12 +661,10 @@ class BatteryVoltageMonitor:
             return
         
         try:
-            self.lcd.clear()
-            
             runtime = (datetime.now() - self.session_start).total_seconds() / 60
             
-            self.lcd.write(0, 0, f"Min:{self.min_voltage:.1f} Max:{self.max_voltage:.1f}")
-            self.lcd.write(1, 0, f"Runtime: {runtime:.0f}min")
+            self._lcd_write(0, LCD_RANGE_ROW.format(self.min_voltage, self.max_voltage))
+            self._lcd_write(1, LCD_RUNTIME_ROW.format(runtime))
             
         except:
             pass
@@ -543,59 +675,48 @@ class BatteryVoltageMonitor:
             return
         
         try:
-            self.lcd.clear()
-            
-            if len(self.voltage_history) > 1:
+            if self._hist_count > 1:
                 # Get recent voltages
-                recent = [h['voltage'] for h in self.voltage_history[-16:]]
+                recent, _ = self._history_window(16)
                 
-                # Normalize to 0-7 range for graph characters
-                v_min = min(recent)
-                v_max = max(recent)
-                v_range = v_max - v_min if v_max > v_min else 1
+                # Normalize to 0-8 range for graph characters
+                levels = np.empty(len(recent), dtype=np.uint8)
+                _graph_levels(recent, levels)
                 
-                # Create graph
-                graph_chars = " ▁▂▃▄▅▆▇█"
-                graph = ""
-                for v in recent:
-                    level = int(((v - v_min) / v_range) * 8)
-                    graph += graph_chars[level]
+                # Create graph: level bytes map straight to graph characters
+                graph = levels.tobytes().decode('latin-1').translate(GRAPH_TABLE)
                 
-                self.lcd.write(0, 0, "Voltage Trend:")
-                self.lcd.write(1, 0, graph)
+                self._lcd_write(0, "Voltage Trend:")
+                self._lcd_write(1, graph)
             else:
-                self.lcd.write(0, 0, "Voltage Trend:")
-                self.lcd.write(1, 0, "Collecting data...")
+                self._lcd_write(0, "Voltage Trend:")
+                self._lcd_write(1, "Collecting data...")
                 
         except:
             pass
     
-    def _alert_monitoring_loop(self):
-        """Monitor for low battery alerts"""
-        while self.monitoring_active:
-            try:
-                current_time = time.time()
-                
-                # Check battery level
-                if self.battery_percentage < self.critical_battery_threshold:
-                    # Critical alert
-                    if current_time - self.last_alert_time > self.alert_interval:
-                        print(f"🚨 CRITICAL BATTERY: {self.battery_voltage:.2f}V ({self.battery_percentage:.0f}%)")
-                        self.buzzer.beep(0.5, 0.5, n=5)
-                        self.last_alert_time = current_time
-                        
-                elif self.battery_percentage < self.low_battery_threshold:
-                    # Low battery alert
-                    if current_time - self.last_alert_time > self.alert_interval * 2:
-                        print(f"⚠️  LOW BATTERY: {self.battery_voltage:.2f}V ({self.battery_percentage:.0f}%)")
-                        self.buzzer.beep(0.2, 0.3, n=3)
-                        self.last_alert_time = current_time
-                
-                time.sleep(5)
+    def _check_alerts(self):
+        """Sound low battery alerts (called from the main loop)"""
+        try:
+            current_time = time.time()
+            
+            # Check battery level
+            if self.battery_percentage < self.critical_battery_threshold:
+                # Critical alert
+                if current_time - self.last_alert_time > self.alert_interval:
+                    print(f"🚨 CRITICAL BATTERY: {self.battery_voltage:.2f}V ({self.battery_percentage:.0f}%)")
+                    self.buzzer.beep(0.5, 0.5, n=5)
+                    self.last_alert_time = current_time
+                    
+            elif self.battery_percentage < self.low_battery_threshold:
+                # Low battery alert
+                if current_time - self.last_alert_time > self.alert_interval * 2:
+                    print(f"⚠️  LOW BATTERY: {self.battery_voltage:.2f}V ({self.battery_percentage:.0f}%)")
+                    self.buzzer.beep(0.2, 0.3, n=3)
+                    self.last_alert_time = current_time
                 
-            except Exception as e:
-                print(f"⚠ Alert error: {e}")
-                time.sleep(5)
+        except Exception as e:
+            print(f"⚠ Alert error: {e}")
     
     def _cycle_display_mode(self):
         """Cycle through display modes"""
@@ -613,6 +734,7 @@ class BatteryVoltageMonitor:
         current_index = types.index(self.battery_type)
         new_index = (current_index + 1) % len(types)
         self.battery_type = types[new_index]
+        self._select_battery_profile()
         
         print(f"🔋 Battery type: {self.battery_type}")
         
@@ -621,9 +743,9 @@ class BatteryVoltageMonitor:
         
         # Update display
         if self.lcd:
-            self.lcd.clear()
-            self.lcd.write(0, 0, "Battery Type:")
-            self.lcd.write(1, 0, self.battery_type)
+            self._lcd_clear()
+            self._lcd_write(0, "Battery Type:")
+            self._lcd_write(1, self.battery_type)
         
         self.buzzer.beep(0.1, 0.1, n=2)
         time.sleep(2)
@@ -634,20 +756,18 @@ class BatteryVoltageMonitor:
         print("Measure actual battery voltage with multimeter")
         
         if self.lcd:
-            self.lcd.clear()
-            self.lcd.write(0, 0, "Calibration Mode")
-            self.lcd.write(1, 0, f"Current: {self.battery_voltage:.2f}V")
-        
-        # Take multiple readings
-        readings = []
-        for i in range(20):
-            adc_value = self.adc.read(BATTERY_CHANNEL)
-            adc_voltage = (adc_value / 255.0) * ADC_REFERENCE_VOLTAGE
-            actual_voltage = adc_voltage * VOLTAGE_DIVIDER_RATIO
-            readings.append(actual_voltage)
+            self._lcd_clear()
+            self._lcd_write(0, "Calibration Mode")
+            self._lcd_write(1, f"Current: {self.battery_voltage:.2f}V")
+        
+        # Take multiple readings, then convert the whole batch at once
+        raw = np.empty(20, dtype=np.float32)
+        for i in range(len(raw)):
+            raw[i] = self.adc.read(BATTERY_CHANNEL)
             time.sleep(0.1)
         
-        avg_reading = mean(readings)
+        volts = raw * ADC_TO_VOLTAGE
+        avg_reading = float(volts.mean())
         
         print(f"Average reading: {avg_reading:.3f}V")
         print("Enter actual voltage (or press Enter to cancel):")
@@ -660,18 +780,17 @@ class BatteryVoltageMonitor:
     
     def _log_battery_data(self):
         """Log battery data to file"""
+        if not self._log_fh:
+            return
+        
         try:
-            log_entry = {
-                'timestamp': datetime.now().isoformat(),
-                'voltage': round(self.battery_voltage, 3),
-                'percentage': round(self.battery_percentage, 1),
-                'discharge_rate': round(self.discharge_rate, 3),
-                'battery_type': self.battery_type
-            }
+            self._log_fh.write(LOG_RECORD.format(
+                datetime.now().isoformat(), self.battery_voltage,
+                self.battery_percentage, self.discharge_rate, self.battery_type))
             
-            with open('battery_log.json', 'a') as f:
-                json.dump(log_entry, f)
-                f.write('\n')
+            # Records come once a minute, and losing power is how a
+            # battery run usually ends, so write each one out right away
+            self._log_fh.flush()
                 
         except Exception as e:
             print(f"⚠ Logging error: {e}")
@@ -683,6 +802,8 @@ class BatteryVoltageMonitor:
         self.led_charging.off()
         self.led_low_battery.off()
         self.led_critical.off()
+        self._last_leds_to_light = 0
+        self._last_alert_level = 'ok'
     
     def get_statistics(self):
         """Get battery statistics"""
@@ -700,9 +821,10 @@ class BatteryVoltageMonitor:
         }
         
         # Calculate average discharge rate
-        if len(self.voltage_history) > 10:
-            voltages = [h['voltage'] for h in self.voltage_history]
-            stats['voltage_stability'] = stdev(voltages)
+        if self._hist_count > 10:
+            # Sample standard deviation (ddof=1, as statistics.stdev)
+            voltages = self._v_buf[:self._hist_count]
+            stats['voltage_stability'] = float(np.std(voltages, ddof=1))
         
         return stats
     
@@ -718,8 +840,8 @@ class BatteryVoltageMonitor:
         
         # Clear display
         if self.lcd:
-            self.lcd.clear()
-            self.lcd.write(0, 0, "System Off")
+            self._lcd_clear()
+            self._lcd_write(0, "System Off")
         
         # Show statistics
         stats = self.get_statistics()
@@ -734,6 +856,10 @@ class BatteryVoltageMonitor:
         # Save final configuration
         self._save_configuration()
         
+        # Flush and close the data log
+        if self._log_fh:
+            self._log_fh.close()
+        
         # Close hardware
         for led in self.led_bar:
             led.close()
@@ -779,7 +905,7 @@ def battery_demo():
             
             # Update displays
             monitor._update_led_bar()
-            monitor.display_queue.put({
+            monitor.display_queue.append({
                 'voltage': voltage,
                 'percentage': monitor.battery_percentage,
                 'discharge_rate': 0.1
@@ -807,12 +933,9 @@ def discharge_test():
         start_voltage = 12.6
         for i in range(10):
             voltage = start_voltage - (i * 0.1)
-            timestamp = datetime.now()
+            timestamp = time.monotonic()
             
-            monitor.voltage_history.append({
-                'voltage': voltage,
-                'timestamp': timestamp
-            })
+            monitor._record_voltage(voltage, timestamp)
             
             if i > 0:
                 monitor._calculate_discharge_rate()
@@ -8,15 +8,22 @@ and programmable timing sequences.
 """
 
 import time
+import math
 import threading
 import queue
 import json
 import os
 from datetime import datetime, timedelta
 from enum import Enum
-from gpiozero import LED, PWMLED, Button, Buzzer
+from gpiozero import LED, PWMLED, Button, Buzzer, Device
 import random
 
+try:
+    from gpiozero.pins.pigpio import PiGPIOFactory
+    PIGPIO_AVAILABLE = True
+except ImportError:
+    PIGPIO_AVAILABLE = False
+
 # Add parent directory to path for shared modules
 import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), '../../_shared'))
@@ -63,6 +70,8 @@ YELLOW_TIME_DEFAULT = 3
 ALL_RED_TIME = 2  # Safety period between changes
 PED_CROSSING_TIME = 20
 EMERGENCY_CLEAR_TIME = 10
+CONTROL_QUEUE_TIMEOUT = 1.0  # Longest the main loop blocks waiting for a command
+VIOLATION_MEAN_INTERVAL = 100  # Average time between simulated violations
 
 class TrafficMode(Enum):
     """Traffic light operating modes"""
@@ -129,6 +138,9 @@ class LEDTrafficLightSystem:
     def __init__(self):
         print("🚦 Initializing LED Traffic Light System...")
         
+        # Pick the pin factory before any device is created
+        self._init_pin_factory()
+        
         # Initialize traffic lights
         self._init_traffic_lights()
         self._init_pedestrian_system()
@@ -171,14 +183,27 @@ class LEDTrafficLightSystem:
         
         # Threading
         self.running = False
-        self.control_queue = queue.Queue()
+        self.control_queue = queue.SimpleQueue()
         self.cycle_thread = None
+        self.violation_timer = None
+        self._interrupt_event = threading.Event()  # Wakes a waiting phase early
+        self._phase_deadline = None  # Monotonic end of the green phase being counted down
         
         # Load configuration
         self._load_configuration()
         
         print("✅ Traffic light system initialized")
     
+    def _init_pin_factory(self):
+        """Use pigpio's edge-interrupt callbacks for the buttons when pigpiod is running"""
+        if not PIGPIO_AVAILABLE:
+            return
+        try:
+            Device.pin_factory = PiGPIOFactory()
+            print("✓ Using pigpio pin factory")
+        except Exception as e:
+            print(f"⚠ pigpio daemon not available, using default pin factory: {e}")
+    
     def _init_traffic_lights(self):
         """Initialize traffic light objects"""
         self.lights = {
@@ -268,26 +293,34 @@ class LEDTrafficLightSystem:
         display_thread = threading.Thread(target=self._display_update_loop, daemon=True)
         display_thread.start()
         
+        # Start violation simulation
+        self._schedule_violation()
+        
         try:
             while True:
-                # Process control commands
-                self._process_control_queue()
+                # Block until a control command arrives
+                try:
+                    command = self.control_queue.get(timeout=CONTROL_QUEUE_TIMEOUT)
+                except queue.Empty:
+                    continue
                 
-                # Check for violations (simulation)
-                if random.random() < 0.001:  # 0.1% chance per loop
-                    self._simulate_violation()
-                
-                time.sleep(0.1)
+                self._dispatch_command(command)
                 
         except KeyboardInterrupt:
             print("\n\n⏹ Shutting down traffic light system...")
             self.running = False
+            self._interrupt_event.set()
+            self._cancel_violation_timer()
             self._all_red()
             time.sleep(1)
     
     def _traffic_cycle_loop(self):
         """Main traffic light cycle control"""
         while self.running:
+            # Start each cycle with a fresh interrupt; requests arriving from
+            # here on will cut the next phase short
+            self._interrupt_event.clear()
+            
             try:
                 if self.emergency_active:
                     self._handle_emergency_mode()
@@ -329,20 +362,15 @@ class LEDTrafficLightSystem:
         self._update_display("N-S GREEN", green_time)
         
         # Wait for green time
-        for i in range(green_time):
-            if not self._check_interrupts():
-                return
-            self._update_countdown(green_time - i)
-            time.sleep(1)
+        if self._wait_phase(green_time, countdown=True):
+            return
         
         # North-South yellow
         self._set_direction_yellow(Direction.NORTH_SOUTH)
         self._update_display("N-S YELLOW", yellow_time)
         
-        for i in range(yellow_time):
-            if not self._check_interrupts():
-                return
-            time.sleep(1)
+        if self._wait_phase(yellow_time):
+            return
         
         # All red (safety period)
         self._all_red()
@@ -353,20 +381,15 @@ class LEDTrafficLightSystem:
         self._set_direction_green(Direction.EAST_WEST)
         self._update_display("E-W GREEN", green_time)
         
-        for i in range(green_time):
-            if not self._check_interrupts():
-                return
-            self._update_countdown(green_time - i)
-            time.sleep(1)
+        if self._wait_phase(green_time, countdown=True):
+            return
         
         # East-West yellow
         self._set_direction_yellow(Direction.EAST_WEST)
         self._update_display("E-W YELLOW", yellow_time)
         
-        for i in range(yellow_time):
-            if not self._check_interrupts():
-                return
-            time.sleep(1)
+        if self._wait_phase(yellow_time):
+            return
         
         # All red (safety period)
         self._all_red()
@@ -376,6 +399,18 @@ class LEDTrafficLightSystem:
         # Increment cycle count
         self.cycle_count += 1
     
+    def _wait_phase(self, duration, countdown=False):
+        """Hold the current phase, returning True if it was interrupted"""
+        if not self._check_interrupts():
+            return True
+        
+        if countdown:
+            self._phase_deadline = time.monotonic() + duration
+        try:
+            return self._interrupt_event.wait(timeout=duration)
+        finally:
+            self._phase_deadline = None
+    
     def _set_direction_green(self, direction):
         """Set specified direction to green"""
         if direction == Direction.NORTH_SOUTH:
@@ -480,6 +515,7 @@ class LEDTrafficLightSystem:
         """Handle pedestrian button press"""
         if not self.pedestrian_request and not self.emergency_active:
             self.pedestrian_request = True
+            self._interrupt_event.set()
             print("👥 Pedestrian crossing requested")
             
             # Visual confirmation
@@ -492,6 +528,7 @@ class LEDTrafficLightSystem:
         """Activate emergency vehicle priority"""
         if not self.emergency_active:
             self.emergency_active = True
+            self._interrupt_event.set()
             print("🚨 Emergency vehicle detected!")
             self.control_queue.put({'type': 'emergency'})
     
@@ -508,11 +545,13 @@ class LEDTrafficLightSystem:
         
         # Special handling for maintenance mode
         if self.mode == TrafficMode.MAINTENANCE:
+            self._interrupt_event.set()
             self._maintenance_mode()
     
     def _toggle_manual(self):
         """Toggle manual control mode"""
         self.manual_override = not self.manual_override
+        self._interrupt_event.set()
         
         if self.manual_override:
             print("🎮 Manual control activated")
@@ -585,6 +624,13 @@ class LEDTrafficLightSystem:
                     # Update general status
                     runtime = (datetime.now() - self.session_start).total_seconds() / 60
                     
+                    # Count down the green phase the cycle thread is waiting on
+                    deadline = self._phase_deadline
+                    if deadline is not None:
+                        remaining = math.ceil(deadline - time.monotonic())
+                        if remaining > 0:
+                            self._update_countdown(remaining)
+                    
                     if self.lcd and runtime > 0:
                         # Show statistics periodically
                         if int(runtime) % 30 == 0:  # Every 30 seconds
@@ -598,18 +644,32 @@ class LEDTrafficLightSystem:
             except Exception as e:
                 print(f"⚠ Display update error: {e}")
     
-    def _process_control_queue(self):
-        """Process control commands"""
-        try:
-            while not self.control_queue.empty():
-                command = self.control_queue.get_nowait()
-                
-                if command['type'] == 'emergency':
-                    # Emergency takes priority
-                    pass  # Handled in main loop
-                    
-        except queue.Empty:
-            pass
+    def _dispatch_command(self, command):
+        """Handle a control command"""
+        if command['type'] == 'emergency':
+            # Emergency takes priority
+            pass  # Handled in traffic cycle loop
+    
+    def _schedule_violation(self):
+        """Arm the timer for the next simulated violation"""
+        # Exponential gaps keep violations random, as a per-loop dice roll did
+        delay = random.expovariate(1 / VIOLATION_MEAN_INTERVAL)
+        self.violation_timer = threading.Timer(delay, self._on_violation_timer)
+        self.violation_timer.daemon = True
+        self.violation_timer.start()
+    
+    def _on_violation_timer(self):
+        """Fire a simulated violation and schedule the next one"""
+        if not self.running:
+            return
+        self._simulate_violation()
+        self._schedule_violation()
+    
+    def _cancel_violation_timer(self):
+        """Stop the violation simulation"""
+        if self.violation_timer:
+            self.violation_timer.cancel()
+            self.violation_timer = None
     
     def _simulate_violation(self):
         """Simulate traffic violation detection"""
@@ -639,6 +699,7 @@ class LEDTrafficLightSystem:
         
         # Stop operation
         self.running = False
+        self._cancel_violation_timer()
         
         # All lights red for safety
         self._all_red()